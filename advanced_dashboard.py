@@ -2,10 +2,18 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import sqlite3
-from typing import List, Dict, Tuple, Optional
-from tennis_api import TennisAPI, format_live_matches, RAPIDAPI_KEY
+from typing import List
+from cache import cached, season_files, side_db
+from db_pool import read_sql
+from derived_tables import load_player_matches
+from elo import current_ratings, rating_files
+from head_to_head import head_to_head
+from match_store import compact_frame
+from player_photos import api_available, photo_urls, prefetch_photos
+from player_search import player_index
+from rankings import ranking_history, top_at_date
+from rolling_form import DEFAULT_DAYS, DEFAULT_WINDOW, rolling_form
+from tennis_api import TennisAPI, format_live_matches
 from datetime import datetime, timedelta
 
 def _realtime_enabled(use_realtime: bool) -> bool:
@@ -13,101 +21,42 @@ def _realtime_enabled(use_realtime: bool) -> bool:
         st.info("Mode temps réel désactivé. Activez 'Afficher les données en temps réel' dans la barre latérale pour charger les données live.")
         return False
 
-    if not RAPIDAPI_KEY or RAPIDAPI_KEY == "votre_cle_api_rapidapi":
+    if not api_available():
         st.warning("Clé RapidAPI manquante. Ajoutez la variable d'environnement TENNIS_API_KEY sur Render pour activer les données live.")
         return False
 
     return True
 
-@st.cache_data
-def load_player_data(file_path: str, player_names: List[str], season: int) -> pd.DataFrame:
-    """Charge les données pour plusieurs joueurs"""
-    try:
-        connexion = sqlite3.connect(file_path)
-        placeholders = ",".join(["?"] * len(player_names))
-        query = f"""
-        SELECT * FROM data 
-        WHERE (Winner IN ({placeholders}) OR Loser IN ({placeholders}))
-        """
-        data = pd.read_sql_query(query, connexion, params=player_names + player_names)
-        connexion.close()
-        
-        # Ajouter une colonne pour le résultat (gagnant/perdant) pour chaque joueur
-        results = []
-        for player in player_names:
-            player_data = data[(data['Winner'] == player) | (data['Loser'] == player)].copy()
-            player_data['Result'] = player_data['Winner'].apply(lambda x: 'Victoire' if x == player else 'Défaite')
-            player_data['Player'] = player
-            results.append(player_data)
-            
-        return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erreur lors du chargement des données: {e}")
-        return pd.DataFrame()
+@cached(files=lambda circuit, player_names, season: season_files(circuit, season))
+def load_player_data(circuit: str, player_names: List[str], season: int) -> pd.DataFrame:
+    """Charge les données pour plusieurs joueurs (une ligne par joueur et par match)"""
+    return compact_frame(load_player_matches(circuit, season, player_names))
 
-def get_player_list(file_path: str) -> List[str]:
+@cached(files=lambda file_path, circuit, season: [file_path, side_db("players.db")])
+def get_player_list(file_path: str, circuit: str, season: int) -> List[str]:
     """Récupère la liste distincte des joueurs présents dans la base pour alimenter la complétion"""
-    try:
-        connexion = sqlite3.connect(file_path)
-        query = """
-        SELECT DISTINCT Winner AS name FROM data
-        UNION
-        SELECT DISTINCT Loser AS name FROM data
-        """
-        df_players = pd.read_sql_query(query, connexion)
-        connexion.close()
-
-        if "name" in df_players.columns:
-            players = (
-                df_players["name"]
-                .dropna()
-                .astype(str)
-                .str.strip()
-                .sort_values()
-                .tolist()
-            )
-            return players
-        return []
-    except Exception as e:
-        st.error(f"Erreur lors du chargement de la liste des joueurs: {e}")
-        return []
-
-def get_player_image_url(player_name: str, circuit: str) -> Optional[str]:
-    """Tente de récupérer une URL de photo pour un joueur via l'API externe"""
-    try:
-        # Si la clé API est la valeur par défaut, on n'essaie pas d'appeler l'API
-        if not RAPIDAPI_KEY or RAPIDAPI_KEY == "votre_cle_api_rapidapi":
-            return None
-
-        api = TennisAPI()
-        results = api.search_players(player_name)
-
-        if results.empty:
-            return None
-
-        # Si la colonne name existe, essayer d'abord une correspondance exacte
-        row = None
-        if "name" in results.columns:
-            exact = results[results["name"] == player_name]
-            if not exact.empty:
-                row = exact.iloc[0]
-            else:
-                row = results.iloc[0]
-        else:
-            row = results.iloc[0]
-
-        # Chercher un champ potentiellement utilisable comme URL d'image
-        possible_cols = ["image", "profile_image", "picture", "photo"]
-        for col in possible_cols:
-            if col in results.columns:
-                value = row.get(col)
-                if isinstance(value, str) and value.startswith("http"):
-                    return value
-
-        return None
-    except Exception:
-        # On ne bloque pas le dashboard si l'API image échoue
-        return None
+    # Index des joueurs gardé en mémoire (toutes saisons), sinon parcours de la base saison
+    players = player_index(circuit).season_names(int(season))
+    if players:
+        return players
+    query = """
+    SELECT DISTINCT Winner AS name FROM data
+    UNION
+    SELECT DISTINCT Loser AS name FROM data
+    """
+    df_players = read_sql(file_path, query)
+
+    if "name" in df_players.columns:
+        players = (
+            df_players["name"]
+            .dropna()
+            .astype(str)
+            .str.strip()
+            .sort_values()
+            .tolist()
+        )
+        return players
+    return []
 
 def create_comparison_metrics(data: pd.DataFrame, players: List[str]) -> None:
     """Affiche les métriques comparatives pour les joueurs sélectionnés"""
@@ -132,6 +81,59 @@ def create_comparison_metrics(data: pd.DataFrame, players: List[str]) -> None:
     
     st.dataframe(pd.DataFrame(metrics).set_index('Joueur'), use_container_width=True)
 
+@cached(files=rating_files)
+def load_elo_ratings(circuit: str) -> pd.DataFrame:
+    """Classement Elo actuel (global et par surface) du circuit"""
+    return current_ratings(circuit)
+
+def display_elo_ratings(circuit: str, players: List[str]) -> None:
+    """Affiche l'Elo actuel, global et par surface, des joueurs sélectionnés"""
+    try:
+        ratings = load_elo_ratings(circuit)
+    except Exception as e:
+        st.warning(f"Classement Elo indisponible : {e}")
+        return
+    if ratings.empty:
+        return
+    st.subheader("Classement Elo (actuel)")
+    ratings = ratings.assign(Rang=range(1, len(ratings) + 1))
+    selected = ratings[ratings['Player'].isin(players)].set_index('Player')
+    if selected.empty:
+        return
+    columns = ['Rang', 'Elo'] + [c for c in selected.columns if c not in ('Rang', 'Elo', 'Matches')]
+    st.dataframe(selected[columns].round(0), use_container_width=True)
+
+def display_head_to_head(circuit: str, player1: str, player2: str) -> None:
+    """Affiche le face-à-face des deux joueurs sur toutes les saisons disponibles"""
+    st.subheader("Face-à-face (toutes saisons)")
+    try:
+        summary, matches = head_to_head(circuit, player1, player2)
+    except Exception as e:
+        st.warning(f"Impossible de charger le face-à-face : {e}")
+        return
+
+    if matches.empty:
+        st.info(f"{player1} et {player2} ne se sont jamais affrontés.")
+        return
+
+    col1, col2 = st.columns(2)
+    col1.metric(player1, int(summary['Wins1'].sum()))
+    col2.metric(player2, int(summary['Wins2'].sum()))
+
+    by_surface = summary.groupby('Surface', dropna=False)[['Wins1', 'Wins2']].sum()
+    by_series = summary.groupby('Series', dropna=False)[['Wins1', 'Wins2']].sum()
+    labels = {'Wins1': f"Victoires {player1}", 'Wins2': f"Victoires {player2}"}
+    col1, col2 = st.columns(2)
+    col1.dataframe(by_surface.rename(columns=labels), use_container_width=True)
+    col2.dataframe(by_series.rename(columns=labels), use_container_width=True)
+
+    st.dataframe(
+        matches.rename(columns={'season': 'Saison', 'Tournament': 'Tournoi', 'Round': 'Tour',
+                                'Winner': 'Vainqueur'}),
+        use_container_width=True,
+        hide_index=True,
+    )
+
 def plot_surface_comparison(data: pd.DataFrame, players: List[str]) -> None:
     """Affiche un graphique comparatif des performances par surface"""
     st.subheader("Performances par Surface")
@@ -269,7 +271,7 @@ def plot_surface_category_heatmap(data: pd.DataFrame, players: List[str]) -> Non
     df["Victoire"] = (df["Result"] == "Victoire").astype(int)
 
     grouped = (
-        df.groupby(["Surface", cat_col])["Victoire"]
+        df.groupby(["Surface", cat_col], observed=True)["Victoire"]
         .mean()
         .reset_index()
         .rename(columns={"Victoire": "WinRate"})
@@ -314,7 +316,7 @@ def plot_season_stacked_results(data: pd.DataFrame, players: List[str]) -> None:
     df["Défaite"] = (df["Result"] == "Défaite").astype(int)
 
     grouped = (
-        df.groupby(["SeasonYear", "Player"])[["Victoire", "Défaite"]]
+        df.groupby(["SeasonYear", "Player"], observed=True)[["Victoire", "Défaite"]]
         .sum()
         .reset_index()
         .melt(
@@ -450,6 +452,42 @@ def display_rankings(use_realtime: bool):
                 use_container_width=True
             )
 
+def display_top10_evolution(circuit: str, season: int) -> None:
+    """Top 10 à une date de la saison et évolution de son classement, calculés depuis
+    les bases locales (aucun appel à l'API)"""
+    st.subheader("Évolution du Top 10")
+    last_day = min(datetime(season, 12, 31), datetime.now()).date()
+    date = st.date_input("Classement au", value=last_day, min_value=datetime(season, 1, 1).date(), max_value=last_day)
+    try:
+        top = top_at_date(circuit, date.isoformat(), 10)
+        history = ranking_history(circuit, top['Player'].tolist(), f"{season}-01-01", date.isoformat())
+    except Exception as e:
+        st.warning(f"Impossible de charger l'historique des classements : {e}")
+        return
+
+    if top.empty:
+        st.info("Aucun classement disponible à cette date.")
+        return
+
+    st.dataframe(
+        top.rename(columns={'Player': 'Joueur', 'Rank': 'Rang', 'Date': 'Dernier match'}),
+        use_container_width=True,
+        hide_index=True,
+    )
+    history = history.assign(Week=pd.to_datetime(history['Week']))
+    fig = px.line(
+        history,
+        x='Week',
+        y='Rank',
+        color='Player',
+        markers=True,
+        hover_data=['Points'],
+        title=f"Classement {circuit.upper()} du Top 10 au {date.strftime('%d/%m/%Y')}",
+    )
+    fig.update_yaxes(autorange='reversed', title='Rang')
+    fig.update_layout(xaxis_title='Semaine')
+    st.plotly_chart(fig, use_container_width=True)
+
 def advanced_dashboard():
     """Affiche le tableau de bord avancé"""
     st.title("🎾 Tableau de Bord Tennis en Temps Réel")
@@ -475,11 +513,18 @@ def advanced_dashboard():
     
     # Sélection des deux joueurs à comparer avec complétion
     st.sidebar.subheader("Sélection des joueurs")
-    available_players = get_player_list(file_path)
+    # Messages affichés ici : les chargeurs mis en cache ne font pas d'appel Streamlit
+    try:
+        available_players = get_player_list(file_path, circuit.lower(), season)
+    except Exception as e:
+        st.error(f"Erreur lors du chargement de la liste des joueurs: {e}")
+        available_players = []
 
     if not available_players:
         st.warning("Impossible de récupérer la liste des joueurs pour cette saison/circuit.")
         return
+    # Photos des joueurs de la saison résolues en arrière-plan
+    prefetch_photos(circuit.lower(), available_players)
 
     player1 = st.sidebar.selectbox(
         "Joueur 1",
@@ -503,7 +548,11 @@ def advanced_dashboard():
         return
     
     # Chargement des données
-    data = load_player_data(file_path, player_names, season)
+    try:
+        data = load_player_data(circuit.lower(), player_names, season)
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des données: {e}")
+        data = pd.DataFrame()
     
     if data.empty:
         st.warning("Aucune donnée trouvée pour les joueurs sélectionnés")
@@ -515,40 +564,48 @@ def advanced_dashboard():
     with tab1:
         # Affichage des photos des joueurs (si disponibles)
         photo_cols = st.columns(len(player_names)) if player_names else []
+        photos = photo_urls(circuit.lower(), player_names)
         for col, player in zip(photo_cols, player_names):
             with col:
-                img_url = get_player_image_url(player, circuit.lower())
+                img_url = photos.get(player)
                 if img_url:
                     st.image(img_url, width=120, caption=player)
                 else:
                     st.markdown(f"**{player}**")
 
         create_comparison_metrics(data, player_names)
+        display_elo_ratings(circuit, player_names)
+
+        if len(player_names) == 2:
+            display_head_to_head(circuit, player1, player2)
         
         # Graphique d'évolution dans le temps
         st.subheader("Évolution des performances dans le temps")
         try:
-            data['Date'] = pd.to_datetime(data['Date'])
-            data_sorted = data.sort_values('Date')
-            
-            # Calcul du taux de victoires glissant
-            rolling_wins = []
-            for player in player_names:
-                player_data = data_sorted[data_sorted['Player'] == player].copy()
-                player_data['Cumulative Wins'] = (player_data['Result'] == 'Victoire').cumsum()
-                player_data['Cumulative Matches'] = range(1, len(player_data) + 1)
-                player_data['Win Rate'] = (player_data['Cumulative Wins'] / player_data['Cumulative Matches']) * 100
-                rolling_wins.append(player_data)
-            
-            df_rolling = pd.concat(rolling_wins)
-            
+            form_cols = st.columns(3)
+            window_kind = form_cols[0].radio("Fenêtre", ["Derniers matchs", "Derniers jours"], horizontal=True)
+            if window_kind == "Derniers matchs":
+                window = form_cols[1].slider("Nombre de matchs", min_value=3, max_value=30, value=DEFAULT_WINDOW)
+                days = None
+            else:
+                window = DEFAULT_WINDOW
+                days = form_cols[1].slider("Nombre de jours", min_value=14, max_value=365, value=DEFAULT_DAYS)
+            by_surface = form_cols[2].checkbox("Par surface")
+
+            # Forme glissante de tous les joueurs en une passe
+            df_form = rolling_form(data, window=window, days=days, by_surface=by_surface)
+            df_form['Win Rate'] = (df_form['Form'] if days is None else df_form['FormDays']) * 100
+            label = f"{window} derniers matchs" if days is None else f"{days} derniers jours"
+
             fig = px.line(
-                df_rolling, 
+                df_form, 
                 x='Date', 
                 y='Win Rate',
                 color='Player',
-                title='Taux de victoires cumulé (fenêtre glissante)',
+                line_dash='Surface' if by_surface else None,
+                title=f'Taux de victoires glissant ({label})',
                 markers=True,
+                hover_data=['MatchNumber'],
                 color_discrete_sequence=px.colors.qualitative.Plotly
             )
             fig.update_layout(yaxis_title='Taux de victoires (%)')
@@ -572,9 +629,8 @@ def advanced_dashboard():
     with tab3:
         display_rankings(use_realtime)
         
-        # Ajouter des graphiques supplémentaires pour les classements
-        st.subheader("Évolution du Top 10")
-        st.info("Fonctionnalité d'évolution du classement à venir dans une prochaine mise à jour.")
+        # Évolution du classement reconstruite depuis les bases saison
+        display_top10_evolution(circuit.lower(), season)
         
     with tab4:
         st.subheader("Prochains Tournois")
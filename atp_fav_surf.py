@@ -1,24 +1,29 @@
 import sqlite3
 import pandas as pd
 import streamlit as st
+from leaderboards import leaderboard
+from elo import season_ratings
 
-@st.cache_data
 def get_atp_favorites_by_surface(season):
-    file_path = f"Data_Base_Tennis/atp_{season}.db"
     try:
-        conn = sqlite3.connect(file_path)
-        query = """
-        SELECT Surface, Winner, COUNT(*) AS Victoires
-        FROM data
-        GROUP BY Surface, Winner
-        ORDER BY Surface, Victoires DESC;
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
-        return data
-    except sqlite3.Error:
+        # Top 10 des victoires par surface, à partir des agrégats (joueur, surface, série)
+        data = leaderboard("atp", season, "Wins", k=10, partition="Surface")
+    except FileNotFoundError:
         st.error(f"Base de données ATP {season} introuvable.")
         return pd.DataFrame()
+    data = data.rename(columns={"Player": "Winner", "Wins": "Victoires"})
+    # Elo de surface en fin de saison
+    try:
+        ratings = season_ratings("atp", season)
+        elo = ratings.drop(columns=["Elo", "Matches"]).melt(id_vars="Player", var_name="Surface", value_name="Elo surface")
+    except (sqlite3.Error, FileNotFoundError, KeyError) as e:
+        st.warning(f"Elo de surface indisponible : {e}")
+    else:
+        if elo.empty:
+            st.info(f"Pas de classement Elo pour la saison {season}.")
+        data = data.merge(elo.rename(columns={"Player": "Winner"}), on=["Surface", "Winner"], how="left")
+        data["Elo surface"] = data["Elo surface"].round(0)
+    return data.sort_values(["Surface", "Victoires"], ascending=[True, False], ignore_index=True)
 
 def atp_fav_surface_dashboard(season):
     st.title(f"Favoris par surface - ATP {season}")
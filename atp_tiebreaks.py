@@ -1,71 +1,59 @@
-import sqlite3
 import pandas as pd
 import streamlit as st
+import pyarrow.dataset as ds
+from cache import cached, season_files
+from leaderboards import leaderboard
+from match_store import load_matches
+from set_scores import with_match_features
+
+TIEBREAK_COLUMNS = [
+    "Series", "Tournament", "Surface", "Date", "Round", "Winner", "Loser", "L1", "W1", "L2", "W2", "L3", "W3", "Tiebreaks",
+]
 
-@st.cache_data
 def get_top_tiebreak_players(season):
     """
     Récupère le top 15 des joueurs avec le plus de matchs avec tie-break hors Grand Chelem.
     """
-    file_path = f"Data_Base_Tennis/atp_{season}.db"
     try:
-        conn = sqlite3.connect(file_path)
-        query = """
-        SELECT Series, Tournament, Surface, Date, Round, Winner, Loser, L1, W1, L2, W2, L3, W3
-        FROM data 
-        WHERE Series <> 'Grand Slam' AND 
-              (L1 + W1 = 13 OR L2 + W2 = 13 OR L3 + W3 = 13);
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        # Compter le nombre de fois où chaque joueur apparaît dans Winner ou Loser
-        players = pd.concat([df["Winner"], df["Loser"]])
-        top_players = players.value_counts().head(15).reset_index()
-        top_players.columns = ["Joueur", "Nombre de matchs avec tie-break"]
-        
-        return top_players, df
-    except sqlite3.Error:
+        # Matchs avec tie-break de chaque joueur (vainqueur ou perdant), hors Grand Chelem
+        top_players = leaderboard("atp", season, "TiebreakMatches", k=15, exclude_series="Grand Slam")
+    except FileNotFoundError:
         st.error(f"Base de données ATP {season} introuvable.")
-        return pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame()
+    top_players.columns = ["Joueur", "Nombre de matchs avec tie-break"]
+
+    return top_players
 
+@cached(files=lambda player_name, season: season_files("atp", season))
 def get_player_matches(player_name, season):
     """
     Récupère tous les matchs d'un joueur spécifique (hors Grand Chelem).
+    Lève FileNotFoundError si la saison est introuvable.
     """
-    file_path = f"Data_Base_Tennis/atp_{season}.db"
-    try:
-        conn = sqlite3.connect(file_path)
-        query = f"""
-        SELECT Series, Tournament, Surface, Date, Round, Winner, Loser, L1, W1, L2, W2, L3, W3
-        FROM data
-        WHERE Series <> 'Grand Slam' AND (Winner = '{player_name}' OR Loser = '{player_name}');
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
-    except sqlite3.Error:
-        st.error(f"Base de données ATP {season} introuvable.")
-        return pd.DataFrame()
+    return load_matches(
+        "atp",
+        season,
+        columns=TIEBREAK_COLUMNS,
+        player=player_name,
+        where=ds.field("Series") != "Grand Slam",
+    )
 
 def get_player_tiebreak_percentage(player_name, season):
     """
     Calcule le pourcentage de matchs avec tie-break pour un joueur spécifique.
     """
     # Récupérer tous les matchs du joueur (hors Grand Chelem)
-    player_matches = get_player_matches(player_name, season)
+    try:
+        player_matches = get_player_matches(player_name, season)
+    except FileNotFoundError:
+        st.error(f"Base de données ATP {season} introuvable.")
+        return 0
     if player_matches.empty:
         return 0
     
-    # Compter les matchs avec au moins un tie-break
-    tiebreak_matches = player_matches[
-        ((player_matches["W1"] == 7.0) & (player_matches["L1"] == 6.0)) |
-        ((player_matches["W1"] == 6.0) & (player_matches["L1"] == 7.0)) |
-        ((player_matches["W2"] == 7.0) & (player_matches["L2"] == 6.0)) |
-        ((player_matches["W2"] == 6.0) & (player_matches["L2"] == 7.0)) |
-        ((player_matches["W3"] == 7.0) & (player_matches["L3"] == 6.0)) |
-        ((player_matches["W3"] == 6.0) & (player_matches["L3"] == 7.0))
-    ]
+    # Compter les matchs avec au moins un tie-break (colonne dérivée Tiebreaks)
+    player_matches = with_match_features(player_matches)
+    tiebreak_matches = player_matches[player_matches["Tiebreaks"] > 0]
     
     # Calculer le pourcentage
     total_matches = len(player_matches)
@@ -82,7 +70,7 @@ def tiebreak_dashboard(season):
     st.title(f"Top 15 des joueurs avec le plus de matchs avec tie-break (hors Grand Chelem) - ATP {season}")
     
     # Récupérer le top 15 des joueurs avec tie-breaks
-    top_players, df = get_top_tiebreak_players(season)
+    top_players = get_top_tiebreak_players(season)
     if top_players.empty:
         st.warning("Aucune donnée trouvée.")
     else:
@@ -0,0 +1,229 @@
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from cache import cached, season_files, side_db
+from db_pool import map_files, read_sql, table_columns
+from elo import pre_match_ratings
+from match_store import season_db_path
+
+# Backtest de stratégies de paris sur les cotes des bases saison (mise d'une unité
+# par pari). Les matchs d'une plage de saisons sont chargés une fois en tableaux ;
+# une stratégie est un vecteur de choix (+1 : parier sur le vainqueur du match,
+# -1 : sur le perdant, 0 : pas de pari) calculé uniquement à partir d'informations
+# d'avant-match (cotes, classements, Elo), puis évaluée par opérations NumPy.
+BOOKMAKERS = {
+    "B365": ("B365W", "B365L"),
+    "PS": ("PSW", "PSL"),
+    "Max": ("MaxW", "MaxL"),
+    "Avg": ("AvgW", "AvgL"),
+}
+STRATEGIES = {
+    "favourite": "Favori des bookmakers",
+    "underdog": "Outsider des bookmakers",
+    "rank": "Mieux classé ATP/WTA",
+    "elo": "Elo le plus élevé",
+    "surface_elo": "Elo de surface le plus élevé",
+    "value_elo": "Valeur (probabilité Elo x cote > 1 + marge)",
+}
+_MATCH_COLUMNS = ["Date", "Surface", "Series", "Round", "Winner", "Loser", "WRank", "LRank", "Comment"]
+_ODDS_COLUMNS = [col for pair in BOOKMAKERS.values() for col in pair]
+
+
+def _season_odds(file_path: str) -> Optional[pd.DataFrame]:
+    """Matchs et cotes d'une saison, None si la base est absente ou vide"""
+    columns = table_columns(file_path, "data")
+    if not columns:
+        return None
+    names = {"Series": "Tier"} if "Series" not in columns else {}
+    selected = [
+        f'"{names.get(col, col)}" AS "{col}"' if names.get(col, col) in columns else f'NULL AS "{col}"'
+        for col in _MATCH_COLUMNS + _ODDS_COLUMNS
+    ]
+    return read_sql(file_path, f"SELECT rowid AS match_id, {', '.join(selected)} FROM data")
+
+
+@cached(files=lambda circuit, seasons: season_files(circuit, seasons) + [side_db("elo.db")], copy_result=False)
+def load_backtest_matches(circuit: str, seasons: Union[int, Iterable[int]]) -> pd.DataFrame:
+    """Matchs d'une plage de saisons avec cotes et Elo d'avant-match, triés par date.
+    Les forfaits (aucun pari réglé) sont écartés."""
+    circuit = circuit.lower()
+    seasons = [int(seasons)] if isinstance(seasons, (int, str)) else [int(s) for s in seasons]
+    frames = map_files(_season_odds, [season_db_path(circuit, s) for s in seasons])
+    frames = [frame.assign(season=s) for s, frame in zip(seasons, frames) if frame is not None and len(frame)]
+    if not frames:
+        raise FileNotFoundError(f"Aucune base {circuit.upper()} pour les saisons {seasons}")
+    matches = pd.concat(frames, ignore_index=True)
+    matches = matches[matches["Comment"] != "Walkover"]
+    matches["Date"] = pd.to_datetime(matches["Date"], errors="coerce")
+    for col in ["WRank", "LRank"] + _ODDS_COLUMNS:
+        matches[col] = pd.to_numeric(matches[col], errors="coerce")
+
+    ratings = pre_match_ratings(circuit, [s for s, _ in matches.groupby("season")])
+    matches = matches.merge(ratings, on=["season", "match_id"], how="left")
+    return matches.sort_values(["Date", "season", "match_id"], ignore_index=True)
+
+
+def _sign(values: np.ndarray) -> np.ndarray:
+    return np.nan_to_num(np.sign(values)).astype(np.int8)
+
+
+def strategy_picks(
+    matches: pd.DataFrame,
+    strategy: str,
+    bookmaker: str = "Avg",
+    surface: Optional[str] = None,
+    series: Optional[str] = None,
+    min_odds: float = 1.0,
+    max_odds: float = np.inf,
+    edge: float = 0.0,
+) -> np.ndarray:
+    """Choix de la stratégie pour chaque match (+1 vainqueur, -1 perdant, 0 pas de pari).
+    Seuls les paris dont la cote est connue et comprise dans [min_odds, max_odds[ sont retenus."""
+    odds_w, odds_l = (matches[col].to_numpy(dtype=float) for col in BOOKMAKERS[bookmaker])
+    if strategy == "favourite":
+        picks = _sign(odds_l - odds_w)
+    elif strategy == "underdog":
+        picks = _sign(odds_w - odds_l)
+    elif strategy == "rank":
+        # Rang inconnu : classé derrière tout joueur classé
+        picks = _sign(np.nan_to_num(matches["LRank"].to_numpy(dtype=float), nan=1e6)
+                      - np.nan_to_num(matches["WRank"].to_numpy(dtype=float), nan=1e6))
+    elif strategy in ("elo", "surface_elo", "value_elo"):
+        prefix = "Surface" if strategy == "surface_elo" else ""
+        gap = (matches[f"Winner{prefix}Elo"].to_numpy(dtype=float)
+               - matches[f"Loser{prefix}Elo"].to_numpy(dtype=float))
+        if strategy == "value_elo":
+            # Espérance de gain d'une unité misée sur chaque joueur
+            p_winner = 1.0 / (1.0 + 10.0 ** (-gap / 400.0))
+            value_w = p_winner * odds_w - 1.0
+            value_l = (1.0 - p_winner) * odds_l - 1.0
+            picks = np.where((value_w > edge) & (value_w >= value_l), 1,
+                             np.where((value_l > edge) & (value_l > value_w), -1, 0)).astype(np.int8)
+        else:
+            picks = _sign(gap)
+    else:
+        raise ValueError(f"Stratégie inconnue : {strategy}")
+
+    odds = np.where(picks > 0, odds_w, odds_l)
+    keep = (picks != 0) & np.isfinite(odds) & (odds > 1.0) & (odds >= min_odds) & (odds < max_odds)
+    if surface is not None:
+        keep &= (matches["Surface"] == surface).to_numpy()
+    if series is not None:
+        keep &= (matches["Series"] == series).to_numpy()
+    return np.where(keep, picks, 0).astype(np.int8)
+
+
+def bet_profits(matches: pd.DataFrame, picks: np.ndarray, bookmaker: str = "Avg") -> np.ndarray:
+    """Gain net de chaque match pour une mise d'une unité (0 sans pari)"""
+    odds_w = matches[BOOKMAKERS[bookmaker][0]].to_numpy(dtype=float)
+    return np.where(picks > 0, odds_w - 1.0, np.where(picks < 0, -1.0, 0.0))
+
+
+def summarize(profits: np.ndarray, picks: np.ndarray) -> dict:
+    """ROI, taux de réussite et drawdown maximal (en unités) d'une série de paris datés"""
+    bets = int(np.count_nonzero(picks))
+    hits = int(np.count_nonzero(picks > 0))
+    equity = np.cumsum(profits)
+    # Drawdown : plus forte baisse depuis un plus haut, capital initial compris
+    peak = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:]
+    return {
+        "Bets": bets,
+        "Hits": hits,
+        "HitRate": hits / bets if bets else np.nan,
+        "Profit": float(equity[-1]) if len(equity) else 0.0,
+        "ROI": float(equity[-1]) / bets if bets else np.nan,
+        "MaxDrawdown": float((peak - equity).max()) if len(equity) else 0.0,
+    }
+
+
+@cached(files=lambda circuit, seasons, *args, **kwargs: season_files(circuit, seasons) + [side_db("elo.db")])
+def run_backtest(
+    circuit: str,
+    seasons: Union[int, Iterable[int]],
+    strategy: str,
+    bookmaker: str = "Avg",
+    surface: Optional[str] = None,
+    series: Optional[str] = None,
+    min_odds: float = 1.0,
+    max_odds: float = np.inf,
+    edge: float = 0.0,
+) -> tuple:
+    """Backtest d'une stratégie, mis en cache par stratégie et plage de saisons :
+    (résumé, courbe de gains cumulés par pari avec Date et Profit)"""
+    matches = load_backtest_matches(circuit, seasons)
+    picks = strategy_picks(matches, strategy, bookmaker, surface, series, min_odds, max_odds, edge)
+    profits = bet_profits(matches, picks, bookmaker)
+    placed = picks != 0
+    equity = pd.DataFrame({"Date": matches["Date"].to_numpy()[placed], "Profit": np.cumsum(profits[placed])})
+    return summarize(profits, picks), equity
+
+
+def sweep(circuit: str, seasons: Union[int, Iterable[int]], grid: List[dict]) -> pd.DataFrame:
+    """Évalue une liste de jeux de paramètres de strategy_picks (clé "strategy"
+    obligatoire) sur la même plage : une ligne par jeu, paramètres et résultats"""
+    matches = load_backtest_matches(circuit, seasons)
+    rows = []
+    for params in grid:
+        picks = strategy_picks(matches, **params)
+        profits = bet_profits(matches, picks, params.get("bookmaker", "Avg"))
+        rows.append({**params, **summarize(profits, picks)})
+    return pd.DataFrame(rows)
+
+
+def backtest_dashboard():
+    st.title("Backtest de stratégies de paris")
+    circuit = st.sidebar.radio("Circuit", ["ATP", "WTA"])
+    seasons = st.sidebar.slider("Saisons", min_value=2000, max_value=2030, value=(2018, 2025))
+    strategy = st.sidebar.selectbox("Stratégie", list(STRATEGIES), format_func=STRATEGIES.get)
+    bookmaker = st.sidebar.selectbox("Bookmaker", list(BOOKMAKERS), index=list(BOOKMAKERS).index("Avg"))
+    surface = st.sidebar.selectbox("Surface", ["Toutes", "Hard", "Clay", "Grass", "Carpet"])
+    min_odds, max_odds = st.sidebar.slider("Cotes jouées", min_value=1.0, max_value=20.0, value=(1.0, 20.0), step=0.05)
+    # Borne haute du curseur : pas de limite
+    max_odds = np.inf if max_odds >= 20.0 else max_odds
+    edge = st.sidebar.slider("Marge minimale (stratégie valeur)", min_value=0.0, max_value=0.5, value=0.05, step=0.01)
+
+    season_range = tuple(range(seasons[0], seasons[1] + 1))
+    try:
+        summary, equity = run_backtest(
+            circuit.lower(), season_range, strategy, bookmaker,
+            None if surface == "Toutes" else surface, None, min_odds, max_odds, edge,
+        )
+    except FileNotFoundError as e:
+        st.error(str(e))
+        return
+
+    if not summary["Bets"]:
+        st.warning("Aucun pari pour ces paramètres.")
+        return
+    cols = st.columns(5)
+    cols[0].metric("Paris", summary["Bets"])
+    cols[1].metric("Taux de réussite", f"{summary['HitRate'] * 100:.1f}%")
+    cols[2].metric("Profit (unités)", f"{summary['Profit']:.1f}")
+    cols[3].metric("ROI", f"{summary['ROI'] * 100:.2f}%")
+    cols[4].metric("Drawdown max (unités)", f"{summary['MaxDrawdown']:.1f}")
+
+    fig = px.line(equity, x="Date", y="Profit", title=f"Gains cumulés - {STRATEGIES[strategy]} ({bookmaker})")
+    fig.update_layout(yaxis_title="Profit (unités)")
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Balayage des plages de cotes pour la stratégie choisie
+    st.subheader("ROI par plage de cotes")
+    bounds = [1.0, 1.3, 1.6, 2.0, 2.5, 3.0, 4.0, 6.0, np.inf]
+    grid = [
+        {"strategy": strategy, "bookmaker": bookmaker, "surface": None if surface == "Toutes" else surface,
+         "min_odds": low, "max_odds": high, "edge": edge}
+        for low, high in zip(bounds[:-1], bounds[1:])
+    ]
+    results = sweep(circuit.lower(), season_range, grid)
+    results["Cotes"] = [f"{low:.2f} - {high:.2f}" if np.isfinite(high) else f"{low:.2f} et plus" for low, high in zip(bounds[:-1], bounds[1:])]
+    st.dataframe(
+        results[["Cotes", "Bets", "HitRate", "ROI", "MaxDrawdown"]].rename(columns={
+            "Bets": "Paris", "HitRate": "Taux de réussite", "MaxDrawdown": "Drawdown max",
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
@@ -0,0 +1,228 @@
+import copy
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from match_store import DATA_DIR, season_db_path
+
+# Cache mémoire partagé par tout le processus (donc par toutes les sessions
+# Streamlit) pour les chargeurs de données. La fraîcheur est vérifiée à chaque
+# appel : une entrée mémorise la signature (mtime, taille) des bases dont elle
+# dépend et n'est plus servie dès qu'une base a changé (réingestion) ou que son
+# TTL est dépassé. Les entrées de toutes les fonctions partagent un budget mémoire,
+# les moins récemment utilisées sont évincées en premier. Chaque fonction tient
+# ses compteurs (succès, échecs, entrées périmées, évictions, octets).
+MEMORY_BUDGET = int(os.environ.get("TENNIS_CACHE_MB", "128")) * 1024 * 1024
+
+_entries = OrderedDict()  # (fonction, arguments) -> _Entry, du moins au plus récent
+_stats = {}
+_lock = threading.Lock()
+_total_bytes = 0
+
+
+class _Entry:
+    __slots__ = ("value", "signature", "created", "size")
+
+    def __init__(self, value, signature: tuple, size: int):
+        self.value = value
+        self.signature = signature
+        self.created = time.monotonic()
+        self.size = size
+
+
+class _Stats:
+    __slots__ = ("hits", "misses", "stale", "evictions", "entries", "bytes")
+
+    def __init__(self):
+        self.hits = self.misses = self.stale = self.evictions = self.entries = self.bytes = 0
+
+
+def _freeze(value):
+    """Argument rendu hachable (listes, ensembles et dictionnaires compris)"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _file_signature(path: str) -> tuple:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path, None
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+# Bases dérivées des saisons ; api_cache.db et photos.db, écrites à chaque appel
+# de l'API, ne sont pas des dépendances des chargeurs
+DERIVED_DBS = ("players.db", "h2h.db", "elo.db", "rankings.db")
+_SEASON_DB = re.compile(r"^(atp|wta)_\d{4}\.db$")
+
+
+def _data_files(circuit: Optional[str] = None) -> list:
+    with os.scandir(DATA_DIR) as entries:
+        return sorted(
+            entry.name for entry in entries
+            if entry.is_file() and (match := _SEASON_DB.match(entry.name)) and circuit in (None, match.group(1))
+        )
+
+
+def data_dir_signature() -> tuple:
+    """Signature des bases saison et des bases dérivées (dépendance par défaut)"""
+    names = _data_files() + list(DERIVED_DBS)
+    return tuple((name, *_file_signature(os.path.join(DATA_DIR, name))[1:]) for name in names)
+
+
+def season_files(circuit: str, seasons) -> list:
+    """Bases d'une saison ou d'une liste de saisons"""
+    if isinstance(seasons, (int, str)):
+        seasons = [int(seasons)]
+    return [season_db_path(circuit.lower(), int(s)) for s in seasons]
+
+
+def circuit_files(circuit: str) -> list:
+    """Toutes les bases saison d'un circuit"""
+    return [os.path.join(DATA_DIR, name) for name in _data_files(circuit.lower())]
+
+
+def side_db(name: str) -> str:
+    """Base partagée du dossier de données (players.db, elo.db, h2h.db...)"""
+    return os.path.join(DATA_DIR, name)
+
+
+def _sizeof(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+def _drop(key) -> None:
+    """Retire une entrée (verrou déjà pris)"""
+    global _total_bytes
+    entry = _entries.pop(key)
+    stats = _stats[key[0]]
+    stats.entries -= 1
+    stats.bytes -= entry.size
+    _total_bytes -= entry.size
+
+
+def _store(key, entry: _Entry) -> None:
+    global _total_bytes
+    with _lock:
+        if key in _entries:
+            _drop(key)
+        if entry.size > MEMORY_BUDGET:
+            return
+        # Éviction LRU jusqu'à faire de la place dans le budget
+        while _entries and _total_bytes + entry.size > MEMORY_BUDGET:
+            oldest = next(iter(_entries))
+            _stats[oldest[0]].evictions += 1
+            _drop(oldest)
+        _entries[key] = entry
+        stats = _stats[key[0]]
+        stats.entries += 1
+        stats.bytes += entry.size
+        _total_bytes += entry.size
+
+
+def cached(
+    files: Optional[Callable[..., Iterable[str]]] = None,
+    ttl: Optional[float] = None,
+    copy_result: bool = True,
+):
+    """Décorateur de mise en cache d'une fonction de chargement.
+
+    files reçoit les arguments de la fonction et renvoie les chemins des bases dont
+    dépend le résultat (par défaut : toutes les bases du dossier de données) ; ttl
+    est une durée de vie en secondes. Le résultat est copié à chaque succès, comme
+    avec st.cache_data, sauf si copy_result est faux. Les exceptions ne sont pas
+    mises en cache.
+    """
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        _stats.setdefault(name, _Stats())
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (name, _freeze(args), _freeze(kwargs))
+            if files is None:
+                signature = data_dir_signature()
+            else:
+                signature = tuple(_file_signature(path) for path in files(*args, **kwargs))
+            stats = _stats[name]
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None:
+                    if entry.signature == signature and (ttl is None or time.monotonic() - entry.created < ttl):
+                        _entries.move_to_end(key)
+                        stats.hits += 1
+                        value = entry.value
+                    else:
+                        stats.stale += 1
+                        _drop(key)
+                        entry = None
+                if entry is None:
+                    stats.misses += 1
+            if entry is not None:
+                return copy.deepcopy(value) if copy_result else value
+
+            value = fn(*args, **kwargs)
+            _store(key, _Entry(value, signature, _sizeof(value)))
+            return copy.deepcopy(value) if copy_result else value
+
+        def clear() -> None:
+            with _lock:
+                for key in [k for k in _entries if k[0] == name]:
+                    _drop(key)
+
+        wrapper.clear = clear
+        return wrapper
+
+    return decorator
+
+
+def cache_stats() -> pd.DataFrame:
+    """Compteurs par fonction mise en cache"""
+    with _lock:
+        rows = [
+            {
+                "Function": name,
+                "Hits": s.hits,
+                "Misses": s.misses,
+                "Stale": s.stale,
+                "Evictions": s.evictions,
+                "Entries": s.entries,
+                "Bytes": s.bytes,
+                "HitRate": s.hits / (s.hits + s.misses) if s.hits + s.misses else np.nan,
+            }
+            for name, s in _stats.items()
+        ]
+    return pd.DataFrame(rows, columns=["Function", "Hits", "Misses", "Stale", "Evictions", "Entries", "Bytes", "HitRate"])
+
+
+def clear_all() -> None:
+    """Vide le cache (les compteurs sont conservés)"""
+    with _lock:
+        for key in list(_entries):
+            _drop(key)
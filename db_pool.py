@@ -0,0 +1,127 @@
+import os
+import pathlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+import pandas as pd
+
+# Pool de connexions SQLite en lecture seule, partagé par tout le processus
+# (donc par toutes les sessions Streamlit) : une connexion par fichier saison.
+# Les fichiers sont ouverts en lecture seule avec mmap : les lectures répétées
+# sont servies par le cache de pages de l'OS. Pas de mode immutable : l'ingestion
+# incrémentale et la migration écrivent dans le fichier en place, et le verrou
+# partagé évite de lire un B-tree à moitié écrit (attente de BUSY_TIMEOUT_S secondes
+# si une écriture est en cours). Si le fichier change, la connexion est rouverte.
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KB = 16 * 1024
+READ_WORKERS = 8
+BUSY_TIMEOUT_S = 30.0
+
+
+class _PooledConnection:
+    def __init__(self, path: str, signature: tuple):
+        self.signature = signature
+        self.lock = threading.Lock()
+        self.closed = False
+        uri = f"{pathlib.Path(path).as_uri()}?mode=ro"
+        self.conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_S, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        self.conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.conn.close()
+
+
+_pool = {}
+_pool_lock = threading.Lock()
+
+
+def _signature(path: str) -> tuple:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise sqlite3.OperationalError(f"unable to open database file: {path}")
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _entry(file_path: str) -> _PooledConnection:
+    path = os.path.abspath(file_path)
+    signature = _signature(path)
+    with _pool_lock:
+        entry = _pool.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry
+        fresh = _PooledConnection(path, signature)
+        _pool[path] = fresh
+    # Fichier modifié depuis l'ouverture : on libère l'ancienne connexion
+    if entry is not None:
+        entry.close()
+    return fresh
+
+
+@contextmanager
+def connection(file_path: str) -> Iterator[sqlite3.Connection]:
+    """Connexion partagée en lecture seule, réservée au thread appelant le temps du bloc"""
+    while True:
+        entry = _entry(file_path)
+        with entry.lock:
+            if entry.closed:
+                continue
+            yield entry.conn
+            return
+
+
+def read_sql(file_path: str, query: str, params: Optional[Sequence] = None) -> pd.DataFrame:
+    with connection(file_path) as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+
+def fetchall(file_path: str, query: str, params: Sequence = ()) -> list:
+    with connection(file_path) as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def has_table(file_path: str, table_name: str) -> bool:
+    try:
+        rows = fetchall(
+            file_path,
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=? LIMIT 1",
+            (table_name,),
+        )
+    except sqlite3.Error:
+        return False
+    return bool(rows)
+
+
+def table_columns(file_path: str, table_name: str) -> list:
+    try:
+        return [row[1] for row in fetchall(file_path, f'PRAGMA table_info("{table_name}")')]
+    except sqlite3.Error:
+        return []
+
+
+def map_files(fn: Callable[[str], object], file_paths: Iterable[str], max_workers: int = READ_WORKERS) -> list:
+    """Applique fn à chaque fichier sur un pool de threads, résultats dans l'ordre des fichiers.
+
+    Chaque fichier a sa propre connexion : les lectures de saisons différentes ne
+    s'attendent pas, et sqlite3 relâche le GIL pendant l'exécution des requêtes.
+    """
+    file_paths = list(file_paths)
+    if len(file_paths) <= 1:
+        return [fn(path) for path in file_paths]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(file_paths))) as pool:
+        return list(pool.map(fn, file_paths))
+
+
+def close_all() -> None:
+    """Ferme toutes les connexions du pool (maintenance, réingestion complète)"""
+    with _pool_lock:
+        entries = list(_pool.values())
+        _pool.clear()
+    for entry in entries:
+        entry.close()
@@ -0,0 +1,312 @@
+import sqlite3
+from typing import List, Optional
+
+import pandas as pd
+
+from cache import cached, season_files
+from db_pool import connection, read_sql, table_columns
+from match_store import load_matches, player_filter, season_db_path
+from players import player_ids
+from set_scores import SET_COLUMNS, with_match_features
+
+# Table longue "une ligne par (joueur, match)" matérialisée dans chaque base saison.
+# Chaque match y apparaît deux fois : orienté côté vainqueur puis côté perdant.
+PLAYER_MATCH_COLUMNS = [
+    "match_id", "PlayerID", "OpponentID", "Player", "Opponent", "Result", "PlayerSets", "OpponentSets",
+    "Date", "Tournament", "Series", "Surface", "Round", "Winner", "Loser", "Wsets", "Lsets",
+]
+
+CHUNK_ROWS = 20000
+
+_MATCH_COLUMNS = [
+    "Date", "Tournament", "Series", "Surface", "Round", "Winner", "Loser", "WinnerID", "LoserID", "Wsets", "Lsets",
+]
+
+
+def clean_names(names: pd.Series) -> pd.Series:
+    """Noms sans espaces parasites (certaines saisons ont 'Djokovic N. '), comme
+    le TRIM() des requêtes des tableaux de bord"""
+    return names.where(names.isna(), names.astype(str).str.strip())
+
+
+def player_match_frame(matches: pd.DataFrame) -> pd.DataFrame:
+    """Passe d'une ligne par match à une ligne par (joueur, match), sans boucle Python"""
+    matches = matches.rename(columns={"Tier": "Series"})
+    match_id = matches["match_id"] if "match_id" in matches.columns else pd.Series(matches.index, index=matches.index)
+    common = pd.DataFrame({"match_id": match_id.to_numpy()})
+    for col in _MATCH_COLUMNS:
+        common[col] = matches[col].to_numpy() if col in matches.columns else None
+    common["Winner"] = clean_names(common["Winner"])
+    common["Loser"] = clean_names(common["Loser"])
+
+    winners = common.assign(
+        PlayerID=common["WinnerID"], OpponentID=common["LoserID"],
+        Player=common["Winner"], Opponent=common["Loser"], Result="Victoire",
+        PlayerSets=common["Wsets"], OpponentSets=common["Lsets"],
+    )
+    losers = common.assign(
+        PlayerID=common["LoserID"], OpponentID=common["WinnerID"],
+        Player=common["Loser"], Opponent=common["Winner"], Result="Défaite",
+        PlayerSets=common["Lsets"], OpponentSets=common["Wsets"],
+    )
+    return pd.concat([winners, losers], ignore_index=True)[PLAYER_MATCH_COLUMNS]
+
+
+_PLAYER_MATCHES_DDL = """
+CREATE TABLE IF NOT EXISTS player_matches (
+    match_id INTEGER, PlayerID INTEGER, OpponentID INTEGER, Player TEXT, Opponent TEXT, Result TEXT, PlayerSets REAL, OpponentSets REAL,
+    Date TIMESTAMP, Tournament TEXT, Series TEXT, Surface TEXT, Round TEXT, Winner TEXT, Loser TEXT,
+    Wsets REAL, Lsets REAL
+)
+"""
+
+
+def _insert_player_matches(conn: sqlite3.Connection, matches: pd.DataFrame) -> int:
+    long = player_match_frame(matches)
+    rows = long.astype(object).where(long.notna(), None).itertuples(index=False, name=None)
+    placeholders = ",".join(["?"] * len(PLAYER_MATCH_COLUMNS))
+    conn.executemany(f"INSERT INTO player_matches VALUES ({placeholders})", rows)
+    return len(long)
+
+
+def _create_player_matches(conn: sqlite3.Connection) -> None:
+    conn.execute(_PLAYER_MATCHES_DDL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_player_matches_player ON player_matches (PlayerID, Surface)")
+    # Repli par nom de load_player_matches (joueur absent du dictionnaire)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_player_matches_name ON player_matches (Player, Surface)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_player_matches_match ON player_matches (match_id)")
+
+
+def build_player_matches(conn: sqlite3.Connection) -> int:
+    """(Re)matérialise la table player_matches d'une base saison"""
+    conn.execute("DROP TABLE IF EXISTS player_matches")
+    _create_player_matches(conn)
+    rows = 0
+    for matches in pd.read_sql_query("SELECT rowid AS match_id, * FROM data", conn, chunksize=CHUNK_ROWS):
+        rows += _insert_player_matches(conn, matches)
+    conn.commit()
+    return rows
+
+
+def refresh_player_matches(conn: sqlite3.Connection, match_ids: List[int]) -> int:
+    """Met à jour player_matches pour les seuls matchs donnés, dans la transaction en cours"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='player_matches'"
+    ).fetchone()
+    _create_player_matches(conn)
+    if not exists:
+        matches = pd.read_sql_query("SELECT rowid AS match_id, * FROM data", conn)
+        return _insert_player_matches(conn, matches)
+
+    rows = 0
+    for start in range(0, len(match_ids), 500):
+        chunk = list(match_ids[start:start + 500])
+        placeholders = ",".join(["?"] * len(chunk))
+        conn.execute(f"DELETE FROM player_matches WHERE match_id IN ({placeholders})", chunk)
+        matches = pd.read_sql_query(
+            f"SELECT rowid AS match_id, * FROM data WHERE rowid IN ({placeholders})", conn, params=chunk
+        )
+        rows += _insert_player_matches(conn, matches)
+    return rows
+
+
+# Agrégats par saison pour les pages de classement ("Favoris surface",
+# "Matchs en 3 sets", "Tie-breaks") : une ligne par (joueur, surface, série).
+SEASON_STATS_COLUMNS = [
+    "Player", "PlayerID", "Surface", "Series", "Wins", "Losses", "ThreeSetMatches", "TiebreakMatches", "Titles",
+]
+_STAT_COLUMNS = SEASON_STATS_COLUMNS[4:]
+
+
+def season_stats_frame(matches: pd.DataFrame) -> pd.DataFrame:
+    """Agrège les matchs d'une saison par (joueur, surface, série), sans boucle Python.
+
+    Un match en 3 sets est un 2-1 (Wsets = 2, Lsets = 1) ; un match avec tie-break
+    a au moins un set 7-6 (colonne dérivée Tiebreaks).
+    """
+    matches = matches.rename(columns={"Tier": "Series"})
+
+    def column(name):
+        if name in matches.columns:
+            return matches[name]
+        return pd.Series(None, index=matches.index, dtype=object)
+
+    def numeric(name):
+        return pd.to_numeric(column(name), errors="coerce")
+
+    three_sets = (numeric("Wsets") == 2) & (numeric("Lsets") == 1)
+    tiebreak = with_match_features(matches)["Tiebreaks"] > 0
+    final = column("Round") == "The Final"
+
+    common = {
+        "Surface": column("Surface"), "Series": column("Series"),
+        "ThreeSetMatches": three_sets, "TiebreakMatches": tiebreak,
+    }
+    winners = pd.DataFrame({
+        "Player": column("Winner"), "PlayerID": numeric("WinnerID"), **common,
+        "Wins": 1, "Losses": 0, "Titles": final,
+    })
+    losers = pd.DataFrame({
+        "Player": column("Loser"), "PlayerID": numeric("LoserID"), **common,
+        "Wins": 0, "Losses": 1, "Titles": False,
+    })
+    long = pd.concat([winners, losers], ignore_index=True)
+    long = long[long["Player"].notna()]
+    long["Player"] = clean_names(long["Player"])
+    stats = long.groupby(["Player", "Surface", "Series"], dropna=False, as_index=False).agg(
+        PlayerID=("PlayerID", "max"), **{col: (col, "sum") for col in _STAT_COLUMNS}
+    )
+    stats[_STAT_COLUMNS] = stats[_STAT_COLUMNS].astype("int64")
+    return stats[SEASON_STATS_COLUMNS]
+
+
+_SEASON_STATS_DDL = """
+CREATE TABLE player_season_stats (
+    Player TEXT, PlayerID INTEGER, Surface TEXT, Series TEXT,
+    Wins INTEGER, Losses INTEGER, ThreeSetMatches INTEGER, TiebreakMatches INTEGER, Titles INTEGER
+)
+"""
+
+
+def build_season_stats(conn: sqlite3.Connection) -> int:
+    """(Re)calcule player_season_stats depuis data, dans la transaction en cours"""
+    stats = season_stats_frame(pd.read_sql_query("SELECT * FROM data", conn))
+    conn.execute("DROP TABLE IF EXISTS player_season_stats")
+    conn.execute(_SEASON_STATS_DDL)
+    rows = stats.astype(object).where(stats.notna(), None).itertuples(index=False, name=None)
+    placeholders = ",".join(["?"] * len(SEASON_STATS_COLUMNS))
+    conn.executemany(f"INSERT INTO player_season_stats VALUES ({placeholders})", rows)
+    return len(stats)
+
+
+def load_season_stats(circuit: str, season: int) -> pd.DataFrame:
+    """Agrégats (joueur, surface, série) d'une saison : table pré-calculée, ou calcul
+    depuis l'entrepôt si la base n'a pas encore été migrée.
+    Lève FileNotFoundError si la saison est introuvable."""
+    file_path = season_db_path(circuit, season)
+    if table_columns(file_path, "player_season_stats"):
+        return read_sql(file_path, "SELECT * FROM player_season_stats")
+    matches = load_matches(
+        circuit,
+        season,
+        columns=["Surface", "Series", "Round", "Winner", "Loser", "WinnerID", "LoserID", "Wsets", "Lsets", "Tiebreaks"]
+        + [col for pair in SET_COLUMNS for col in pair],
+    )
+    return season_stats_frame(matches)
+
+
+# Fiches joueur pré-calculées : une ligne par joueur de la saison (la base saison
+# fixe le circuit et la saison), plus le détail par surface. Les sommes de sets
+# et nombres de matchs (Grand Chelem / hors Grand Chelem) permettent de
+# recalculer les moyennes, y compris en additionnant plusieurs saisons.
+PLAYER_CARD_COLUMNS = [
+    "Player", "PlayerID", "Matches", "Wins", "Losses", "Titles", "GrandSlamTitles",
+    "GrandSlamMatches", "GrandSlamSets", "OtherMatches", "OtherSets",
+]
+PLAYER_CARD_SURFACE_COLUMNS = ["Player", "Surface", "Titles", "ThreeSetMatches"]
+
+
+def player_cards_frame(matches: pd.DataFrame) -> tuple:
+    """Fiches de tous les joueurs d'une saison en un seul groupby (joueur, surface)
+    sur la table longue ; retourne (fiches, détail par surface)."""
+    long = player_match_frame(matches)
+    long = long[long["Player"].notna()]
+    won = long["Result"] == "Victoire"
+    slam = long["Series"] == "Grand Slam"
+    sets = pd.to_numeric(long["PlayerSets"], errors="coerce") + pd.to_numeric(long["OpponentSets"], errors="coerce")
+    titles = won & (long["Round"] == "The Final")
+    flags = pd.DataFrame({
+        "Player": long["Player"],
+        "Surface": long["Surface"],
+        "PlayerID": pd.to_numeric(long["PlayerID"], errors="coerce"),
+        "Matches": 1,
+        "Wins": won,
+        "Losses": ~won,
+        "Titles": titles,
+        "GrandSlamTitles": titles & slam,
+        "ThreeSetMatches": sets == 3,
+        "GrandSlamMatches": slam,
+        "GrandSlamSets": sets.where(slam, 0),
+        "OtherMatches": ~slam,
+        "OtherSets": sets.where(~slam, 0),
+    })
+    counts = [c for c in flags.columns if c not in ("Player", "Surface", "PlayerID")]
+    by_surface = flags.groupby(["Player", "Surface"], dropna=False, as_index=False).agg(
+        PlayerID=("PlayerID", "max"), **{col: (col, "sum") for col in counts}
+    )
+    cards = by_surface.drop(columns="Surface").groupby("Player", as_index=False).agg(
+        PlayerID=("PlayerID", "max"), **{col: (col, "sum") for col in counts}
+    )
+    return cards[PLAYER_CARD_COLUMNS], by_surface[PLAYER_CARD_SURFACE_COLUMNS]
+
+
+_PLAYER_CARDS_DDL = """
+CREATE TABLE player_cards (
+    Player TEXT PRIMARY KEY, PlayerID INTEGER, Matches INTEGER, Wins INTEGER, Losses INTEGER,
+    Titles INTEGER, GrandSlamTitles INTEGER, GrandSlamMatches INTEGER, GrandSlamSets REAL,
+    OtherMatches INTEGER, OtherSets REAL
+)
+"""
+_PLAYER_CARD_SURFACES_DDL = """
+CREATE TABLE player_card_surfaces (Player TEXT, Surface TEXT, Titles INTEGER, ThreeSetMatches INTEGER)
+"""
+
+
+def build_player_cards(conn: sqlite3.Connection) -> int:
+    """(Re)calcule player_cards et player_card_surfaces depuis data, dans la transaction en cours"""
+    cards, surfaces = player_cards_frame(pd.read_sql_query("SELECT rowid AS match_id, * FROM data", conn))
+    for table, ddl, frame in (
+        ("player_cards", _PLAYER_CARDS_DDL, cards),
+        ("player_card_surfaces", _PLAYER_CARD_SURFACES_DDL, surfaces),
+    ):
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(ddl)
+        rows = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+        conn.executemany(f"INSERT INTO {table} VALUES ({','.join(['?'] * len(frame.columns))})", rows)
+    conn.execute("CREATE INDEX idx_player_card_surfaces ON player_card_surfaces (Player)")
+    return len(cards)
+
+
+@cached(files=lambda circuit, season, player_name: season_files(circuit, season))
+def load_player_card(circuit: str, season: int, player_name: str) -> Optional[tuple]:
+    """Fiche pré-calculée d'un joueur, mise en cache : (fiche, lignes
+    (Surface, Titles, ThreeSetMatches) triées par surface), None si la base n'a
+    pas de fiches ou si le joueur n'y figure pas."""
+    file_path = season_db_path(circuit, season)
+    if not table_columns(file_path, "player_cards"):
+        return None
+    with connection(file_path) as conn:
+        row = conn.execute("SELECT * FROM player_cards WHERE Player = ?", (player_name,)).fetchone()
+        if row is None:
+            return None
+        surfaces = conn.execute(
+            "SELECT Surface, Titles, ThreeSetMatches FROM player_card_surfaces "
+            "WHERE Player = ? AND Surface IS NOT NULL ORDER BY Surface",
+            (player_name,),
+        ).fetchall()
+    return dict(zip(PLAYER_CARD_COLUMNS, row)), surfaces
+
+
+def load_player_matches(circuit: str, season: int, player_names: List[str]) -> pd.DataFrame:
+    """Matchs orientés joueur pour une saison : recherche indexée sur player_matches
+    (par identifiant joueur), ou calcul vectorisé depuis l'entrepôt si la base n'a
+    pas encore été migrée."""
+    file_path = season_db_path(circuit, season)
+    columns = table_columns(file_path, "player_matches")
+    if columns:
+        ids = player_ids(circuit, player_names)
+        if "PlayerID" in columns and len(ids) == len(player_names):
+            key, values = "PlayerID", list(ids.values())
+        else:
+            key, values = "Player", list(player_names)
+        placeholders = ",".join(["?"] * len(values))
+        return read_sql(
+            file_path,
+            f"SELECT * FROM player_matches WHERE {key} IN ({placeholders}) ORDER BY Date",
+            params=values,
+        )
+
+    matches = load_matches(circuit, season, columns=_MATCH_COLUMNS, where=player_filter(player_names, circuit))
+    long = player_match_frame(matches)
+    long = long[long["Player"].isin(player_names)]
+    return long.sort_values("Date", kind="stable", ignore_index=True)
@@ -0,0 +1,262 @@
+import os
+import pathlib
+import sqlite3
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from cache import cached, circuit_files, side_db
+from db_pool import read_sql, table_columns
+from match_store import DATA_DIR
+from players import season_from_db_file
+
+# Classement Elo global et par surface, rejoué match par match dans l'ordre des
+# dates sur toutes les saisons d'un circuit. L'état (note et nombre de matchs de
+# chaque joueur, global et par surface) est enregistré après chaque saison dans la
+# base partagée elo.db : réingérer une saison ne rejoue qu'à partir de celle-ci.
+INITIAL_RATING = 1500.0
+ALL_SURFACES = "All"
+
+# Facteur K dégressif avec l'expérience du joueur : K = 250 / (matchs + 5) ** 0.4
+K_BASE = 250.0
+K_OFFSET = 5.0
+K_SHAPE = 0.4
+
+PRE_MATCH_COLUMNS = ["WinnerElo", "LoserElo", "WinnerSurfaceElo", "LoserSurfaceElo"]
+
+_ELO_RATINGS_DDL = """
+CREATE TABLE IF NOT EXISTS elo_ratings (
+    circuit TEXT NOT NULL, season INTEGER NOT NULL, Surface TEXT NOT NULL, Player TEXT NOT NULL,
+    Rating REAL, Matches INTEGER,
+    PRIMARY KEY (circuit, season, Surface, Player)
+) WITHOUT ROWID
+"""
+_ELO_MATCHES_DDL = """
+CREATE TABLE IF NOT EXISTS elo_matches (
+    circuit TEXT NOT NULL, season INTEGER NOT NULL, match_id INTEGER NOT NULL,
+    WinnerElo REAL, LoserElo REAL, WinnerSurfaceElo REAL, LoserSurfaceElo REAL,
+    PRIMARY KEY (circuit, season, match_id)
+) WITHOUT ROWID
+"""
+_ELO_SEASONS_DDL = """
+CREATE TABLE IF NOT EXISTS elo_seasons (
+    circuit TEXT NOT NULL, season INTEGER NOT NULL, matches INTEGER,
+    PRIMARY KEY (circuit, season)
+)
+"""
+
+
+def elo_db_path(data_dir: Optional[str] = None) -> str:
+    return os.path.join(data_dir or DATA_DIR, "elo.db")
+
+
+def _k_factor(matches: int) -> float:
+    return K_BASE / (matches + K_OFFSET) ** K_SHAPE
+
+
+def replay(matches: pd.DataFrame, state: Dict[tuple, list]) -> pd.DataFrame:
+    """Rejoue des matchs triés par date et met à jour state en place.
+
+    state associe (joueur, surface) à [note, matchs joués], surface ALL_SURFACES
+    pour le classement global. Retourne les notes d'avant-match (PRE_MATCH_COLUMNS)
+    alignées sur matches. Les forfaits (Comment = "Walkover") ne modifient pas les notes.
+    """
+    winners = matches["Winner"].tolist()
+    losers = matches["Loser"].tolist()
+    surfaces = matches["Surface"].tolist() if "Surface" in matches.columns else [None] * len(matches)
+    played = (matches["Comment"] != "Walkover").tolist() if "Comment" in matches.columns else [True] * len(matches)
+    pre = np.full((len(matches), 4), np.nan)
+
+    for i in range(len(winners)):
+        w, l, surface = winners[i], losers[i], surfaces[i]
+        tracks = ((0, ALL_SURFACES),) if surface is None else ((0, ALL_SURFACES), (2, surface))
+        for column, track in tracks:
+            rating_w = state.get((w, track))
+            if rating_w is None:
+                rating_w = state[(w, track)] = [INITIAL_RATING, 0]
+            rating_l = state.get((l, track))
+            if rating_l is None:
+                rating_l = state[(l, track)] = [INITIAL_RATING, 0]
+            pre[i, column] = rating_w[0]
+            pre[i, column + 1] = rating_l[0]
+            if not played[i]:
+                continue
+            # Probabilité de victoire attendue du vainqueur
+            surprise = 1.0 - 1.0 / (1.0 + 10.0 ** ((rating_l[0] - rating_w[0]) / 400.0))
+            rating_w[0] += _k_factor(rating_w[1]) * surprise
+            rating_l[0] -= _k_factor(rating_l[1]) * surprise
+            rating_w[1] += 1
+            rating_l[1] += 1
+
+    return pd.DataFrame(pre, columns=PRE_MATCH_COLUMNS, index=matches.index)
+
+
+def _season_files(circuit: str, data_dir: str) -> Dict[int, str]:
+    """{saison: base} des saisons d'un circuit présentes dans data_dir"""
+    files = {}
+    for name in os.listdir(data_dir):
+        season = season_from_db_file(name)
+        if season is not None and season[0] == circuit:
+            files[season[1]] = os.path.join(data_dir, name)
+    return dict(sorted(files.items()))
+
+
+def _season_matches(db_file: str) -> pd.DataFrame:
+    """Matchs d'une saison dans l'ordre de rejeu (date puis ordre du fichier)"""
+    conn = sqlite3.connect(f"{pathlib.Path(os.path.abspath(db_file)).as_uri()}?mode=ro", uri=True)
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(data)")}
+        if not {"Date", "Winner", "Loser"} <= columns:
+            return pd.DataFrame(columns=["match_id", "Winner", "Loser", "Surface", "Comment"])
+        optional = ", ".join(f"{c}" if c in columns else f"NULL AS {c}" for c in ("Surface", "Comment"))
+        matches = pd.read_sql_query(
+            f"""
+            SELECT rowid AS match_id, TRIM(Winner) AS Winner, TRIM(Loser) AS Loser, {optional} FROM data
+            WHERE Winner IS NOT NULL AND Loser IS NOT NULL
+            ORDER BY Date, rowid
+            """,
+            conn,
+        )
+    finally:
+        conn.close()
+    return matches.astype({"Surface": object}).where(matches.notna(), None)
+
+
+def _state_rows(circuit: str, season: int, state: Dict[tuple, list]):
+    return ((circuit, season, surface, player, rating, count) for (player, surface), (rating, count) in state.items())
+
+
+def compute_elo(circuit: str, data_dir: Optional[str] = None) -> tuple:
+    """Rejeu complet en mémoire (sans elo.db) : (notes d'avant-match avec season et
+    match_id, état final {(joueur, surface): [note, matchs]})"""
+    state = {}
+    frames = []
+    for season, db_file in _season_files(circuit.lower(), data_dir or DATA_DIR).items():
+        matches = _season_matches(db_file)
+        frames.append(replay(matches, state).assign(season=season, match_id=matches["match_id"]))
+    pre = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=PRE_MATCH_COLUMNS + ["season", "match_id"])
+    return pre, state
+
+
+def replay_elo(circuit: str, from_season: int, data_dir: Optional[str] = None) -> int:
+    """Rejoue les saisons à partir de from_season en repartant de l'état enregistré
+    après la saison précédente, et enregistre notes d'avant-match et états de fin de
+    saison dans elo.db. Retourne le nombre de matchs rejoués."""
+    data_dir = data_dir or DATA_DIR
+    files = _season_files(circuit, data_dir)
+    # Plusieurs processus (reconstruction parallèle) peuvent écrire en même temps
+    index = sqlite3.connect(elo_db_path(data_dir), timeout=60)
+    replayed = 0
+    try:
+        with index:
+            index.execute("BEGIN IMMEDIATE")
+            for ddl in (_ELO_RATINGS_DDL, _ELO_MATCHES_DDL, _ELO_SEASONS_DDL):
+                index.execute(ddl)
+            # Une saison antérieure jamais rejouée avance le point de départ
+            done = {row[0] for row in index.execute("SELECT season FROM elo_seasons WHERE circuit = ?", (circuit,))}
+            start = next((s for s in files if s < from_season and s not in done), from_season)
+            previous = max((s for s in files if s < start), default=None)
+
+            state = {}
+            if previous is not None:
+                rows = index.execute(
+                    "SELECT Player, Surface, Rating, Matches FROM elo_ratings WHERE circuit = ? AND season = ?",
+                    (circuit, previous),
+                )
+                state = {(player, surface): [rating, count] for player, surface, rating, count in rows}
+
+            for table in ("elo_ratings", "elo_matches", "elo_seasons"):
+                index.execute(f"DELETE FROM {table} WHERE circuit = ? AND season >= ?", (circuit, start))
+            for season, db_file in files.items():
+                if season < start:
+                    continue
+                matches = _season_matches(db_file)
+                pre = replay(matches, state)
+                index.executemany(
+                    "INSERT INTO elo_matches VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    zip([circuit] * len(pre), [season] * len(pre), matches["match_id"].tolist(),
+                        *(pre[col].where(pre[col].notna(), None).tolist() for col in PRE_MATCH_COLUMNS)),
+                )
+                index.executemany("INSERT INTO elo_ratings VALUES (?, ?, ?, ?, ?, ?)", _state_rows(circuit, season, state))
+                index.execute("INSERT INTO elo_seasons VALUES (?, ?, ?)", (circuit, season, len(matches)))
+                replayed += len(matches)
+    finally:
+        index.close()
+    return replayed
+
+
+def update_elo(db_file: str) -> int:
+    """Rejoue le classement Elo à partir de la saison de db_file (après son ingestion)"""
+    season = season_from_db_file(db_file)
+    if season is None:
+        return 0
+    return replay_elo(season[0], season[1], os.path.dirname(os.path.abspath(db_file)))
+
+
+def _state_frame(state: Dict[tuple, list]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [(player, surface, rating, count) for (player, surface), (rating, count) in state.items()],
+        columns=["Player", "Surface", "Rating", "Matches"],
+    )
+
+
+def _ratings_table(long: pd.DataFrame) -> pd.DataFrame:
+    """Une ligne par joueur : Elo global, matchs et une colonne Elo par surface"""
+    overall = long[long["Surface"] == ALL_SURFACES].set_index("Player")
+    by_surface = long[long["Surface"] != ALL_SURFACES].pivot(index="Player", columns="Surface", values="Rating")
+    table = overall[["Rating", "Matches"]].rename(columns={"Rating": "Elo"}).join(by_surface)
+    return table.sort_values("Elo", ascending=False).reset_index()
+
+
+def rating_files(circuit: str, *args, **kwargs) -> list:
+    """Dépendances d'un classement Elo : elo.db et les bases saison du circuit (rejeu)"""
+    return [side_db("elo.db")] + circuit_files(circuit)
+
+
+@cached(files=rating_files)
+def season_ratings(circuit: str, season: Optional[int] = None) -> pd.DataFrame:
+    """Classement Elo à la fin d'une saison (la dernière par défaut) : Player, Elo,
+    Matches et une colonne par surface, du mieux classé au moins bien classé."""
+    circuit = circuit.lower()
+    path = elo_db_path()
+    if table_columns(path, "elo_seasons"):
+        if season is None:
+            latest = read_sql(path, "SELECT MAX(season) AS season FROM elo_seasons WHERE circuit = ?", (circuit,))
+            season = latest["season"].iloc[0]
+        if season is not None and not pd.isna(season):
+            long = read_sql(
+                path,
+                "SELECT Player, Surface, Rating, Matches FROM elo_ratings WHERE circuit = ? AND season = ?",
+                (circuit, int(season)),
+            )
+            return _ratings_table(long)
+
+    # elo.db absent : rejeu en mémoire jusqu'à la saison demandée
+    state = {}
+    for year, db_file in _season_files(circuit, DATA_DIR).items():
+        if season is not None and year > int(season):
+            break
+        replay(_season_matches(db_file), state)
+    return _ratings_table(_state_frame(state))
+
+
+def current_ratings(circuit: str) -> pd.DataFrame:
+    return season_ratings(circuit)
+
+
+def pre_match_ratings(circuit: str, seasons: Union[int, Iterable[int]]) -> pd.DataFrame:
+    """Notes Elo d'avant-match (PRE_MATCH_COLUMNS) par season et match_id (rowid de data)"""
+    circuit = circuit.lower()
+    seasons = [int(seasons)] if isinstance(seasons, (int, str)) else [int(s) for s in seasons]
+    path = elo_db_path()
+    if table_columns(path, "elo_matches"):
+        placeholders = ",".join(["?"] * len(seasons))
+        return read_sql(
+            path,
+            f"SELECT season, match_id, {', '.join(PRE_MATCH_COLUMNS)} FROM elo_matches "
+            f"WHERE circuit = ? AND season IN ({placeholders})",
+            [circuit, *seasons],
+        )
+    pre, _ = compute_elo(circuit)
+    return pre[pre["season"].isin(seasons)][["season", "match_id"] + PRE_MATCH_COLUMNS].reset_index(drop=True)
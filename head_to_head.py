@@ -0,0 +1,191 @@
+import os
+import sqlite3
+from typing import Optional
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from db_pool import connection, table_columns
+from match_store import DATA_DIR, discover_sources, load_matches
+from players import season_from_db_file
+from set_scores import SET_COLUMNS
+
+# Index des face-à-face, toutes saisons et deux circuits, dans une base partagée.
+# Une paire est rangée dans l'ordre (PlayerA < PlayerB). La clé primaire
+# (circuit, PlayerA, PlayerB, Date, ...) d'une table WITHOUT ROWID range les
+# matchs d'une paire de façon contiguë et datée : une recherche est un parcours
+# de plage. h2h_summary tient les victoires de chacun par surface et série.
+_H2H_MATCHES_DDL = """
+CREATE TABLE IF NOT EXISTS h2h_matches (
+    circuit TEXT NOT NULL, PlayerA TEXT NOT NULL, PlayerB TEXT NOT NULL, Date TEXT, season INTEGER NOT NULL,
+    match_id INTEGER NOT NULL, Tournament TEXT, Series TEXT, Surface TEXT, Round TEXT, Winner TEXT, Score TEXT,
+    AWon INTEGER,
+    PRIMARY KEY (circuit, PlayerA, PlayerB, Date, season, match_id)
+) WITHOUT ROWID
+"""
+_H2H_SUMMARY_DDL = """
+CREATE TABLE IF NOT EXISTS h2h_summary (
+    circuit TEXT NOT NULL, PlayerA TEXT NOT NULL, PlayerB TEXT NOT NULL, Surface TEXT, Series TEXT,
+    AWins INTEGER, BWins INTEGER
+)
+"""
+_H2H_COLUMNS = [
+    "circuit", "PlayerA", "PlayerB", "Date", "season", "match_id",
+    "Tournament", "Series", "Surface", "Round", "Winner", "Score", "AWon",
+]
+
+
+def h2h_db_path(data_dir: Optional[str] = None) -> str:
+    return os.path.join(data_dir or DATA_DIR, "h2h.db")
+
+
+def _score(matches: pd.DataFrame) -> pd.Series:
+    """Score lisible ("6-4 7-6") à partir des colonnes W1..L5"""
+    score = pd.Series("", index=matches.index)
+    for w, l in SET_COLUMNS:
+        if w not in matches.columns or l not in matches.columns:
+            continue
+        games_w = pd.to_numeric(matches[w], errors="coerce")
+        games_l = pd.to_numeric(matches[l], errors="coerce")
+        played = games_w.notna() & games_l.notna()
+        text = games_w.fillna(0).astype(int).astype(str) + "-" + games_l.fillna(0).astype(int).astype(str)
+        score = score.where(~played, (score + " " + text).str.strip())
+    return score
+
+
+def h2h_frame(circuit: str, season: int, matches: pd.DataFrame) -> pd.DataFrame:
+    """Lignes h2h_matches d'une saison (une par match, paire ordonnée)"""
+    matches = matches.rename(columns={"Tier": "Series"})
+    matches = matches[matches["Winner"].notna() & matches["Loser"].notna()]
+    winner = matches["Winner"].astype(str).str.strip()
+    loser = matches["Loser"].astype(str).str.strip()
+    a_won = winner < loser
+
+    def column(name):
+        return matches[name] if name in matches.columns else None
+
+    frame = pd.DataFrame({
+        "circuit": circuit,
+        "PlayerA": winner.where(a_won, loser),
+        "PlayerB": loser.where(a_won, winner),
+        # Date fait partie de la clé primaire (non nulle) : texte ISO, vide si inconnue
+        "Date": pd.to_datetime(matches["Date"], errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+        if "Date" in matches.columns else "",
+        "season": season,
+        "match_id": matches["match_id"],
+        "Tournament": column("Tournament"),
+        "Series": column("Series"),
+        "Surface": column("Surface"),
+        "Round": column("Round"),
+        "Winner": winner,
+        "Score": _score(matches),
+        "AWon": a_won.astype(int),
+    })
+    return frame[_H2H_COLUMNS]
+
+
+def update_head_to_head(conn: sqlite3.Connection, db_file: str) -> int:
+    """Remplace la saison de db_file dans l'index et recalcule les bilans des seules
+    paires concernées (anciennes et nouvelles). Retourne le nombre de matchs indexés."""
+    season = season_from_db_file(db_file)
+    if season is None or not conn.execute("PRAGMA table_info(data)").fetchall():
+        return 0
+    circuit, year = season
+    frame = h2h_frame(circuit, year, pd.read_sql_query("SELECT rowid AS match_id, * FROM data", conn))
+    rows = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+
+    # Plusieurs processus (reconstruction parallèle) peuvent écrire en même temps
+    index = sqlite3.connect(h2h_db_path(os.path.dirname(os.path.abspath(db_file))), timeout=60)
+    try:
+        with index:
+            index.execute("BEGIN IMMEDIATE")
+            index.execute(_H2H_MATCHES_DDL)
+            index.execute(_H2H_SUMMARY_DDL)
+            index.execute("CREATE INDEX IF NOT EXISTS idx_h2h_matches_season ON h2h_matches (circuit, season)")
+            index.execute("CREATE INDEX IF NOT EXISTS idx_h2h_summary_pair ON h2h_summary (circuit, PlayerA, PlayerB)")
+            index.execute("CREATE TEMP TABLE IF NOT EXISTS h2h_pairs (PlayerA TEXT, PlayerB TEXT, PRIMARY KEY (PlayerA, PlayerB))")
+            index.execute("DELETE FROM temp.h2h_pairs")
+            index.execute(
+                "INSERT OR IGNORE INTO temp.h2h_pairs SELECT PlayerA, PlayerB FROM h2h_matches WHERE circuit = ? AND season = ?",
+                (circuit, year),
+            )
+            index.execute("DELETE FROM h2h_matches WHERE circuit = ? AND season = ?", (circuit, year))
+            index.executemany(f"INSERT INTO h2h_matches VALUES ({','.join(['?'] * len(_H2H_COLUMNS))})", rows)
+            index.executemany(
+                "INSERT OR IGNORE INTO temp.h2h_pairs VALUES (?, ?)",
+                frame[["PlayerA", "PlayerB"]].drop_duplicates().itertuples(index=False, name=None),
+            )
+            index.execute(
+                "DELETE FROM h2h_summary WHERE circuit = ? AND (PlayerA, PlayerB) IN (SELECT PlayerA, PlayerB FROM temp.h2h_pairs)",
+                (circuit,),
+            )
+            index.execute(
+                """
+                INSERT INTO h2h_summary
+                SELECT m.circuit, m.PlayerA, m.PlayerB, m.Surface, m.Series, SUM(m.AWon), SUM(1 - m.AWon)
+                FROM temp.h2h_pairs p JOIN h2h_matches m
+                  ON m.circuit = ? AND m.PlayerA = p.PlayerA AND m.PlayerB = p.PlayerB
+                GROUP BY m.circuit, m.PlayerA, m.PlayerB, m.Surface, m.Series
+                """,
+                (circuit,),
+            )
+            index.execute("DROP TABLE temp.h2h_pairs")
+    finally:
+        index.close()
+    return len(frame)
+
+
+def head_to_head(circuit: str, player1: str, player2: str) -> tuple:
+    """Face-à-face de player1 contre player2, toutes saisons : (bilan par surface et
+    série avec Wins1 / Wins2, liste des matchs du plus récent au plus ancien).
+
+    Lecture indexée dans h2h.db ; à défaut d'index, parcours de toutes les saisons.
+    """
+    circuit = circuit.lower()
+    player1, player2 = player1.strip(), player2.strip()
+    swapped = player1 > player2
+    a, b = (player2, player1) if swapped else (player1, player2)
+
+    path = h2h_db_path()
+    if table_columns(path, "h2h_summary"):
+        # Bilan orienté dès la requête : Wins1 est toujours celui de player1
+        wins = "BWins, AWins" if swapped else "AWins, BWins"
+        with connection(path) as conn:
+            summary = conn.execute(
+                f"SELECT Surface, Series, {wins} FROM h2h_summary WHERE circuit = ? AND PlayerA = ? AND PlayerB = ?",
+                (circuit, a, b),
+            ).fetchall()
+            matches = conn.execute(
+                """
+                SELECT season, Date, Tournament, Series, Surface, Round, Winner, Score FROM h2h_matches
+                WHERE circuit = ? AND PlayerA = ? AND PlayerB = ? ORDER BY Date DESC
+                """,
+                (circuit, a, b),
+            ).fetchall()
+        summary = pd.DataFrame(summary, columns=["Surface", "Series", "Wins1", "Wins2"])
+        matches = pd.DataFrame(matches, columns=["season", "Date", "Tournament", "Series", "Surface", "Round", "Winner", "Score"])
+        return summary, matches
+
+    seasons = [season for (c, season) in discover_sources() if c == circuit]
+    try:
+        found = load_matches(circuit, seasons, where=_pair_filter(player1, player2))
+    except FileNotFoundError:
+        found = pd.DataFrame(columns=["Winner", "Loser", "Date", "season", "match_id"])
+    found = found.assign(match_id=range(len(found)))
+    frame = pd.concat(
+        [h2h_frame(circuit, int(season), group) for season, group in found.groupby("season")]
+    ) if len(found) else pd.DataFrame(columns=_H2H_COLUMNS)
+    frame["Wins1"] = (frame["Winner"] == player1).astype(int)
+    frame["Wins2"] = (frame["Winner"] == player2).astype(int)
+    summary = frame.groupby(["Surface", "Series"], dropna=False, as_index=False)[["Wins1", "Wins2"]].sum()
+    matches = frame.sort_values("Date", ascending=False)[
+        ["season", "Date", "Tournament", "Series", "Surface", "Round", "Winner", "Score"]
+    ].reset_index(drop=True)
+    return summary, matches
+
+
+def _pair_filter(player1: str, player2: str) -> ds.Expression:
+    return (
+        ((ds.field("Winner") == player1) & (ds.field("Loser") == player2))
+        | ((ds.field("Winner") == player2) & (ds.field("Loser") == player1))
+    )
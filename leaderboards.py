@@ -0,0 +1,170 @@
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+from cache import cached, season_files
+from db_pool import map_files, read_sql, table_columns
+from derived_tables import load_season_stats
+from match_store import season_db_path
+
+# Moteur de classements : top K des joueurs sur une métrique de player_season_stats,
+# avec un filtre déclaratif (circuit, saisons, surface, série, série exclue).
+# L'agrégation se fait en SQL sur la table pré-calculée (ORDER BY ... LIMIT, ou
+# ROW_NUMBER() par partition) : un nouveau classement ne relit pas les matchs.
+# Seuls les joueurs atteignant un score minimal (min_score) sont classés ; les
+# égalités sont départagées par ordre alphabétique des joueurs.
+METRICS = {
+    "Wins": "Wins",
+    "Losses": "Losses",
+    "Matches": "Wins + Losses",
+    "ThreeSetMatches": "ThreeSetMatches",
+    "TiebreakMatches": "TiebreakMatches",
+    "Titles": "Titles",
+}
+PARTITIONS = ("Surface", "Series")
+
+
+def _conditions(surface, series, exclude_series, partition) -> tuple:
+    """Clause WHERE (texte, paramètres) du filtre ; exclude_series écarte aussi les
+    séries inconnues"""
+    clauses, params = [], []
+    if surface is not None:
+        clauses.append("Surface = ?")
+        params.append(surface)
+    if series is not None:
+        clauses.append("Series = ?")
+        params.append(series)
+    if exclude_series is not None:
+        clauses.append("Series IS NOT NULL AND Series != ?")
+        params.append(exclude_series)
+    if partition is not None:
+        clauses.append(f"{partition} IS NOT NULL")
+    return " AND ".join(clauses) or "1", params
+
+
+def _filter_stats(stats: pd.DataFrame, surface, series, exclude_series, partition) -> pd.DataFrame:
+    """Même filtre que _conditions, sur un DataFrame d'agrégats"""
+    mask = pd.Series(True, index=stats.index)
+    if surface is not None:
+        mask &= stats["Surface"] == surface
+    if series is not None:
+        mask &= stats["Series"] == series
+    if exclude_series is not None:
+        mask &= stats["Series"].notna() & (stats["Series"] != exclude_series)
+    if partition is not None:
+        mask &= stats[partition].notna()
+    return stats[mask]
+
+
+def _top_k(totals: pd.DataFrame, k: Optional[int], partition: Optional[str], min_score: int = 1) -> pd.DataFrame:
+    keys = [partition] if partition else []
+    totals = totals[totals["value"] >= min_score]
+    totals = totals.sort_values(keys + ["value", "Player"], ascending=[True] * len(keys) + [False, True])
+    if k is not None:
+        totals = totals.groupby(keys).head(k) if keys else totals.head(k)
+    return totals.reset_index(drop=True)
+
+
+def _season_totals(file_path, circuit, season, metric, k, surface, series, exclude_series, partition, min_score=1) -> pd.DataFrame:
+    """Totaux par joueur (et partition) d'une saison d'au moins min_score ; tronqués
+    au top k si k est donné"""
+    keys = [partition] if partition else []
+    if table_columns(file_path, "player_season_stats"):
+        where, params = _conditions(surface, series, exclude_series, partition)
+        group = ", ".join(keys + ["Player"])
+        query = (
+            f"SELECT {group}, SUM({METRICS[metric]}) AS value FROM player_season_stats "
+            f"WHERE {where} GROUP BY {group} HAVING value >= ?"
+        )
+        params = [*params, int(min_score)]
+        if k is not None and partition:
+            query = (
+                f"SELECT {group}, value FROM (SELECT *, ROW_NUMBER() OVER "
+                f"(PARTITION BY {partition} ORDER BY value DESC, Player) AS position FROM ({query})) "
+                f"WHERE position <= {int(k)} ORDER BY {partition}, position"
+            )
+        elif k is not None:
+            query += f" ORDER BY value DESC, Player LIMIT {int(k)}"
+        return read_sql(file_path, query, params)
+
+    # Base non migrée : agrégats calculés depuis l'entrepôt
+    stats = _filter_stats(load_season_stats(circuit, season), surface, series, exclude_series, partition)
+    stats = stats.assign(value=stats.eval(METRICS[metric]))
+    totals = stats.groupby(keys + ["Player"], as_index=False)["value"].sum()
+    return _top_k(totals, k, partition, min_score)
+
+
+@cached(files=lambda circuit, seasons, *args, **kwargs: season_files(circuit, seasons))
+def leaderboard(
+    circuit: str,
+    seasons: Union[int, Iterable[int]],
+    metric: str,
+    k: int = 15,
+    surface: Optional[str] = None,
+    series: Optional[str] = None,
+    exclude_series: Optional[str] = None,
+    partition: Optional[str] = None,
+    min_score: int = 1,
+) -> pd.DataFrame:
+    """Top k des joueurs sur metric (clé de METRICS), filtrés par surface / série, ou
+    top k par valeur de partition ("Surface" ou "Series"). Colonnes : [partition,]
+    Player, metric ; seuls les joueurs dont la valeur atteint min_score (au moins 1)
+    sont classés. Mis en cache par filtre. Lève FileNotFoundError si aucune saison
+    n'est disponible."""
+    if metric not in METRICS:
+        raise ValueError(f"Métrique inconnue : {metric}")
+    if min_score < 1:
+        raise ValueError(f"Score minimal invalide : {min_score}")
+    if partition is not None and partition not in PARTITIONS:
+        raise ValueError(f"Partition inconnue : {partition}")
+    circuit = circuit.lower()
+    seasons = [int(seasons)] if isinstance(seasons, (int, str)) else [int(s) for s in seasons]
+
+    # Une seule saison : le top k sort directement de la requête ; plusieurs saisons :
+    # totaux complets par saison, additionnés avant le classement et le score minimal
+    single = len(seasons) == 1
+    available = [s for s in seasons if table_columns(season_db_path(circuit, s), "data")]
+    if not available:
+        raise FileNotFoundError(f"Aucune base {circuit.upper()} pour les saisons {seasons}")
+    frames = map_files(
+        lambda s: _season_totals(
+            season_db_path(circuit, s), circuit, s, metric, k if single else None,
+            surface, series, exclude_series, partition, min_score if single else 1,
+        ),
+        available,
+    )
+    keys = [partition] if partition else []
+    totals = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if not single:
+        totals = _top_k(totals.groupby(keys + ["Player"], as_index=False)["value"].sum(), k, partition, min_score)
+    totals = totals.astype({"value": "int64"}).rename(columns={"value": metric})
+    return totals[keys + ["Player", metric]].reset_index(drop=True)
+
+
+@cached(files=lambda circuit, seasons, *args, **kwargs: season_files(circuit, seasons))
+def player_totals(
+    circuit: str,
+    seasons: Union[int, Iterable[int]],
+    player_name: str,
+    surface: Optional[str] = None,
+    series: Optional[str] = None,
+    exclude_series: Optional[str] = None,
+) -> dict:
+    """Toutes les métriques de METRICS d'un joueur sous le même filtre (0 si absent)"""
+    circuit = circuit.lower()
+    seasons = [int(seasons)] if isinstance(seasons, (int, str)) else [int(s) for s in seasons]
+    totals = dict.fromkeys(METRICS, 0)
+    for season in seasons:
+        file_path = season_db_path(circuit, season)
+        if table_columns(file_path, "player_season_stats"):
+            where, params = _conditions(surface, series, exclude_series, None)
+            stats = read_sql(file_path, f"SELECT * FROM player_season_stats WHERE Player = ? AND {where}", [player_name, *params])
+        else:
+            try:
+                stats = load_season_stats(circuit, season)
+            except FileNotFoundError:
+                continue
+            stats = _filter_stats(stats[stats["Player"] == player_name], surface, series, exclude_series, None)
+        for metric, expression in METRICS.items():
+            totals[metric] += int(stats.eval(expression).sum()) if len(stats) else 0
+    return totals
@@ -1,4 +1,6 @@
 import streamlit as st
+import pandas as pd
+from datetime import date
 from atp_dashboard import atp_dashboard
 from wta_dashboard import wta_dashboard
 from atp_fav_surf import atp_fav_surface_dashboard
@@ -10,32 +12,61 @@ from advanced_dashboard import advanced_dashboard
 # Import des nouvelles fonctionnalités
 from atp_tiebreaks import tiebreak_dashboard as atp_tiebreak_dashboard
 from wta_tiebreaks import tiebreak_dashboard as wta_tiebreak_dashboard
+from backtest import backtest_dashboard
+from tournament_sim import tournament_simulator_dashboard
+from cache import cache_stats
+from player_search import search_players
+from warmup import start_warmup, warmup_status
 
 st.set_page_config(page_title="Tableau de bord Tennis", layout="wide")
 
+# Préchauffage des caches en arrière-plan (une fois par processus)
+start_warmup()
+
 st.title("Tableau de bord des performances des joueurs ATP et WTA")
 
 st.sidebar.title("Menu principal")
 menu = st.sidebar.radio(
     "Choisissez une option :",
-    ["Dashboard ATP", "Dashboard WTA", "Comparaison avancée", "Favoris surface", "Matchs en 3 sets", "Tie-breaks"],
+    ["Dashboard ATP", "Dashboard WTA", "Comparaison avancée", "Favoris surface", "Matchs en 3 sets", "Tie-breaks", "Backtest paris", "Simulation tournoi"],
 )
 
+def season_or_range():
+    # Saison unique, ou plage de saisons en mode carrière
+    if st.sidebar.checkbox("Mode carrière (plusieurs saisons)"):
+        return st.sidebar.slider("Saisons", min_value=2000, max_value=date.today().year, value=(2014, date.today().year))
+    return st.sidebar.number_input("Entrez l'année de la saison (ex : 2024)", min_value=2000, max_value=2100, value=2024)
+
+def resolve_player_name(player_name, circuit, season):
+    # Saisie approximative : nom exact le plus proche, parmi les joueurs de la saison si possible
+    season_filter = season if isinstance(season, int) else None
+    matches = search_players(player_name, circuit, 5, season_filter) or search_players(player_name, circuit, 5)
+    if not matches:
+        return player_name
+    best = matches[0][0]
+    if best != player_name:
+        st.sidebar.caption(f"Résultat pour : {best}")
+        if len(matches) > 1:
+            st.sidebar.caption("Autres noms proches : " + ", ".join(name for name, _ in matches[1:]))
+    return best
+
 if menu == "Dashboard ATP":
-    # Saisie de l'année
-    season = st.sidebar.number_input("Entrez l'année de la saison (ex : 2024)", min_value=2000, max_value=2100, value=2024)
+    # Saisie de l'année ou de la plage de saisons
+    season = season_or_range()
     player_name = st.sidebar.text_input("Nom du joueur (ex : 'Djokovic N.')")
     if player_name:
+        player_name = resolve_player_name(player_name, "atp", season)
         try:
             atp_dashboard(player_name, season)
         except Exception as e:
             st.error(f"Aucune donnée trouvée pour ce joueur avec les filtres sélectionnés. (Erreur : {str(e)})")
 
 elif menu == "Dashboard WTA":
-    # Saisie de l'année
-    season = st.sidebar.number_input("Entrez l'année de la saison (ex : 2024)", min_value=2000, max_value=2100, value=2024)
+    # Saisie de l'année ou de la plage de saisons
+    season = season_or_range()
     player_name = st.sidebar.text_input("Nom de la joueuse (ex : 'Swiatek I.')")
     if player_name:
+        player_name = resolve_player_name(player_name, "wta", season)
         try:
             wta_dashboard(player_name, season)
         except Exception as e:
@@ -78,4 +109,26 @@ elif menu == "Tie-breaks":
         elif tiebreak_menu == "WTA":
             wta_tiebreak_dashboard(season)
     except Exception as e:
-        st.error(f"Aucune donnée trouvée pour cette année. (Erreur : {str(e)})")
\ No newline at end of file
+        st.error(f"Aucune donnée trouvée pour cette année. (Erreur : {str(e)})")
+
+elif menu == "Backtest paris":
+    backtest_dashboard()
+
+elif menu == "Simulation tournoi":
+    tournament_simulator_dashboard()
+
+# Compteurs du cache de données (après le rendu de la page)
+with st.sidebar.expander("Statistiques du cache"):
+    warmup = warmup_status()
+    if warmup["state"] != "pending":
+        st.progress(
+            warmup["done"] / warmup["total"] if warmup["total"] else 1.0,
+            text=f"Préchauffage : {warmup['done']}/{warmup['total']} étapes en {warmup['elapsed']:.1f} s",
+        )
+    st.dataframe(cache_stats().query("Hits + Misses > 0"), hide_index=True, use_container_width=True)
+    if warmup["steps"]:
+        st.dataframe(
+            pd.DataFrame(warmup["steps"], columns=["Étape", "Durée (s)", "Erreur"]),
+            hide_index=True,
+            use_container_width=True,
+        )
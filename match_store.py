@@ -0,0 +1,267 @@
+import os
+import re
+import sqlite3
+from typing import Iterable, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from db_pool import read_sql
+from players import player_ids
+from set_scores import with_match_features
+
+# Entrepôt colonne multi-saisons (Parquet partitionné par circuit et saison)
+# construit à partir des fichiers Data_Base_Tennis/{circuit}_{saison}.db / .xlsx
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "Data_Base_Tennis")
+STORE_DIR = os.path.join(DATA_DIR, "match_store")
+
+CIRCUITS = ("atp", "wta")
+
+# Schéma normalisé commun à tous les fichiers sources. La colonne de numéro de
+# tournoi ("ATP" ou "WTA") devient "TournamentNo" et "Tier" (WTA 2026) devient "Series".
+MATCH_SCHEMA = pa.schema(
+    [
+        ("TournamentNo", pa.int32()),
+        ("Location", pa.string()),
+        ("Tournament", pa.string()),
+        ("Date", pa.timestamp("ns")),
+        ("Series", pa.string()),
+        ("Court", pa.string()),
+        ("Surface", pa.string()),
+        ("Round", pa.string()),
+        ("Best of", pa.int8()),
+        ("Winner", pa.string()),
+        ("Loser", pa.string()),
+        ("WinnerID", pa.int32()),
+        ("LoserID", pa.int32()),
+        ("WRank", pa.int32()),
+        ("LRank", pa.int32()),
+        ("WPts", pa.int32()),
+        ("LPts", pa.int32()),
+        ("W1", pa.int8()),
+        ("L1", pa.int8()),
+        ("W2", pa.int8()),
+        ("L2", pa.int8()),
+        ("W3", pa.int8()),
+        ("L3", pa.int8()),
+        ("W4", pa.int8()),
+        ("L4", pa.int8()),
+        ("W5", pa.int8()),
+        ("L5", pa.int8()),
+        ("Wsets", pa.int8()),
+        ("Lsets", pa.int8()),
+        ("Tiebreaks", pa.int8()),
+        ("Bagels", pa.int8()),
+        ("Breadsticks", pa.int8()),
+        ("DecidingSet", pa.bool_()),
+        ("Comeback", pa.bool_()),
+        ("Comment", pa.string()),
+        ("B365W", pa.float64()),
+        ("B365L", pa.float64()),
+        ("PSW", pa.float64()),
+        ("PSL", pa.float64()),
+        ("MaxW", pa.float64()),
+        ("MaxL", pa.float64()),
+        ("AvgW", pa.float64()),
+        ("AvgL", pa.float64()),
+    ]
+)
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("circuit", pa.string()), ("season", pa.int16())]), flavor="hive"
+)
+
+# Types compacts des DataFrames de matchs mis en cache par les dashboards :
+# catégories pour les libellés répétés, float32 pour les scores/sets/cotes
+# (NaN possibles), datetime64 pour Date.
+_CATEGORY_COLUMNS = [
+    "Location", "Tournament", "Series", "Tier", "Court", "Surface", "Round", "Winner", "Loser", "Comment",
+    "Player", "Opponent", "Result",
+]
+_FLOAT32_COLUMNS = [
+    "W1", "L1", "W2", "L2", "W3", "L3", "W4", "L4", "W5", "L5", "Wsets", "Lsets", "PlayerSets", "OpponentSets",
+    "Best of", "WRank", "LRank", "WPts", "LPts",
+    "B365W", "B365L", "PSW", "PSL", "MaxW", "MaxL", "AvgW", "AvgL",
+]
+COMPACT_DTYPES = {
+    **{col: "category" for col in _CATEGORY_COLUMNS},
+    **{col: "float32" for col in _FLOAT32_COLUMNS},
+    **{col: "int32" for col in ("match_id", "WinnerID", "LoserID", "PlayerID", "OpponentID")},
+    **{col: "int8" for col in ("Tiebreaks", "Bagels", "Breadsticks")},
+    **{col: "bool" for col in ("DecidingSet", "Comeback")},
+    "Date": "datetime64[ns]",
+    "season": "int16",
+    "Saison": "int16",
+}
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convertit les colonnes connues d'un DataFrame de matchs vers COMPACT_DTYPES.
+
+    Les colonnes catégorielles imposent groupby(..., observed=True) côté appelant.
+    """
+    out = df.copy(deep=False)
+    for col, dtype in COMPACT_DTYPES.items():
+        if col not in out.columns:
+            continue
+        if dtype == "datetime64[ns]":
+            out[col] = pd.to_datetime(out[col], errors="coerce")
+        elif dtype == "float32":
+            out[col] = pd.to_numeric(out[col], errors="coerce").astype("float32")
+        elif dtype in ("int8", "int32", "bool"):
+            values = pd.to_numeric(out[col], errors="coerce")
+            # Valeurs manquantes (base non migrée) : float32 pour garder les NaN
+            out[col] = values.astype(dtype if values.notna().all() else "float32")
+        else:
+            out[col] = out[col].astype(dtype)
+    return out
+
+
+_SOURCE_PATTERN = re.compile(r"^(atp|wta)_(\d{4})\.(db|xlsx)$")
+
+
+def season_db_path(circuit: str, season: int) -> str:
+    return os.path.join(DATA_DIR, f"{circuit}_{season}.db")
+
+
+def _partition_dir(circuit: str, season: int, store_dir: Optional[str] = None) -> str:
+    return os.path.join(store_dir or STORE_DIR, f"circuit={circuit}", f"season={season}")
+
+
+def discover_sources() -> dict:
+    """Retourne {(circuit, saison): chemin} en privilégiant le .db au .xlsx"""
+    sources = {}
+    for name in sorted(os.listdir(DATA_DIR)):
+        match = _SOURCE_PATTERN.match(name)
+        if not match:
+            continue
+        circuit, season, ext = match.group(1), int(match.group(2)), match.group(3)
+        if ext == "xlsx" and (circuit, season) in sources:
+            continue
+        sources[(circuit, season)] = os.path.join(DATA_DIR, name)
+    return sources
+
+
+def normalize_matches(df: pd.DataFrame) -> pa.Table:
+    """Aligne un DataFrame brut d'une saison sur MATCH_SCHEMA"""
+    df = df.rename(columns={"ATP": "TournamentNo", "WTA": "TournamentNo", "Tier": "Series"})
+    # Caractéristiques de match : colonnes de la base, ou calculées depuis les scores
+    df = with_match_features(df)
+    columns = {}
+    for field in MATCH_SCHEMA:
+        col = df[field.name] if field.name in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if pa.types.is_string(field.type):
+            col = col.where(col.notna(), None).astype(object)
+            col = col.map(lambda v: str(v).strip() if v is not None else None)
+        elif pa.types.is_timestamp(field.type):
+            col = pd.to_datetime(col, errors="coerce")
+        elif pa.types.is_boolean(field.type):
+            col = pd.to_numeric(col, errors="coerce").fillna(0).astype(bool)
+        else:
+            col = pd.to_numeric(col, errors="coerce")
+        columns[field.name] = col
+    return pa.Table.from_pandas(pd.DataFrame(columns), schema=MATCH_SCHEMA, preserve_index=False)
+
+
+def _read_source(path: str) -> Optional[pd.DataFrame]:
+    """Lit la table brute d'un fichier saison (.db ou .xlsx), None si inexploitable"""
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path)
+    try:
+        return read_sql(path, "SELECT * FROM data")
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return None
+
+
+def build_partition(circuit: str, season: int, source_path: str, store_dir: Optional[str] = None) -> int:
+    """(Re)construit la partition Parquet d'une saison, retourne le nombre de matchs"""
+    raw = _read_source(source_path)
+    if raw is None or raw.empty:
+        return 0
+    table = normalize_matches(raw)
+    target = _partition_dir(circuit, season, store_dir)
+    os.makedirs(target, exist_ok=True)
+    pq.write_table(table, os.path.join(target, "part-0.parquet"), compression="zstd")
+    return table.num_rows
+
+
+def build_store() -> pd.DataFrame:
+    """Fusionne toutes les saisons ATP/WTA dans l'entrepôt Parquet"""
+    summary = []
+    for (circuit, season), path in sorted(discover_sources().items()):
+        rows = build_partition(circuit, season, path)
+        summary.append({"circuit": circuit, "season": season, "source": os.path.basename(path), "matchs": rows})
+    return pd.DataFrame(summary)
+
+
+def player_filter(player_names: Union[str, List[str]], circuit: Optional[str] = None) -> ds.Expression:
+    """Filtre (Winner OR Loser parmi les joueurs), sur WinnerID / LoserID quand le
+    circuit est donné et que tous les noms figurent dans le dictionnaire des joueurs"""
+    names = [player_names] if isinstance(player_names, str) else list(player_names)
+    ids = player_ids(circuit, names) if circuit is not None else {}
+    if names and len(ids) == len(names):
+        values = list(ids.values())
+        return ds.field("WinnerID").isin(values) | ds.field("LoserID").isin(values)
+    return ds.field("Winner").isin(names) | ds.field("Loser").isin(names)
+
+
+def load_matches(
+    circuit: str,
+    seasons: Union[int, Iterable[int]],
+    columns: Optional[List[str]] = None,
+    player: Optional[str] = None,
+    where: Optional[ds.Expression] = None,
+) -> pd.DataFrame:
+    """Charge les matchs d'un circuit sur une ou plusieurs saisons.
+
+    Lit uniquement les colonnes demandées dans les partitions Parquet ; une saison
+    absente de l'entrepôt est lue directement depuis son fichier SQLite.
+    Lève FileNotFoundError si aucune des saisons demandées n'est disponible.
+    """
+    circuit = circuit.lower()
+    seasons = [int(seasons)] if isinstance(seasons, (int, str)) else [int(s) for s in seasons]
+
+    expression = None
+    if player is not None:
+        expression = player_filter(player, circuit)
+    if where is not None:
+        expression = where if expression is None else expression & where
+
+    stored = [s for s in seasons if os.path.isdir(_partition_dir(circuit, s))]
+    fallback = [s for s in seasons if s not in stored]
+
+    wanted = list(columns) if columns is not None else MATCH_SCHEMA.names + ["season"]
+    data_columns = [c for c in wanted if c not in ("circuit", "season")]
+
+    tables = []
+    if stored:
+        dataset = ds.dataset(STORE_DIR, format="parquet", partitioning=PARTITIONING, schema=_dataset_schema())
+        scope = (ds.field("circuit") == circuit) & ds.field("season").isin(stored)
+        if expression is not None:
+            scope = scope & expression
+        tables.append(dataset.to_table(columns=data_columns + ["season"], filter=scope))
+
+    for season in fallback:
+        raw = _read_source(season_db_path(circuit, season)) if os.path.exists(season_db_path(circuit, season)) else None
+        if raw is None:
+            continue
+        table = normalize_matches(raw)
+        table = table.append_column("season", pa.array([season] * table.num_rows, type=pa.int16()))
+        tables.append(ds.dataset(table).to_table(columns=data_columns + ["season"], filter=expression))
+
+    if not tables:
+        raise FileNotFoundError(f"Aucune base {circuit.upper()} pour les saisons {seasons}")
+
+    frame = pa.concat_tables(tables).to_pandas()
+    return frame[[c for c in wanted if c != "circuit"]]
+
+
+def _dataset_schema() -> pa.Schema:
+    return MATCH_SCHEMA.append(pa.field("circuit", pa.string())).append(pa.field("season", pa.int16()))
+
+
+if __name__ == "__main__":
+    print(build_store().to_string(index=False))
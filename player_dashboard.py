@@ -0,0 +1,92 @@
+import sqlite3
+
+import pandas as pd
+
+from cache import cached, season_files
+from db_pool import map_files, read_sql
+from match_store import compact_frame, season_db_path
+from players import player_clause
+
+# Lecture des matchs d'un joueur et statistiques communes aux tableaux de bord
+# ATP et WTA (saison, carrière, fiche pré-calculée) ; le circuit est un paramètre.
+# Les classeurs ATP ont cinq sets, les classeurs WTA trois.
+SET_COLUMNS = {
+    "atp": "W1, L1, W2, L2, W3, L3, W4, L4, W5, L5",
+    "wta": "W1, L1, W2, L2, W3, L3",
+}
+
+
+def season_file(circuit, season):
+    return season_db_path(circuit, season)
+
+
+def read_player_matches(file_path, circuit, player_name, surface_condition="", series_condition=""):
+    try:
+        player_condition, params = player_clause(file_path, circuit, player_name)
+        # Noms nettoyés : la clause par identifiant ramène aussi les variantes 'Nom ' (espace final)
+        query = f"""
+        SELECT Series, Tournament, Surface, Round, TRIM(Winner) AS Winner, TRIM(Loser) AS Loser, {SET_COLUMNS[circuit]}, Wsets, Lsets
+        FROM data
+        WHERE {player_condition} {surface_condition} {series_condition};
+        """
+        return read_sql(file_path, query, params=params)
+    except (sqlite3.OperationalError, pd.errors.DatabaseError):
+        return pd.DataFrame()  # Retourne un DataFrame vide en cas d'erreur
+
+
+def load_seasons(reader, circuit, seasons, *args):
+    # Une base par saison, lues en parallèle ; résultats concaténés avec leur saison
+    files = {s: season_file(circuit, s) for s in range(seasons[0], seasons[1] + 1)}
+    frames = map_files(lambda file_path: reader(file_path, *args), files.values())
+    frames = [compact_frame(frame).assign(Saison=s) for s, frame in zip(files, frames) if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+@cached(files=lambda circuit, player_name, seasons, *args, **kwargs: season_files(circuit, range(seasons[0], seasons[1] + 1)))
+def load_career_data(circuit, player_name, seasons, surface_condition="", series_condition=""):
+    """Matchs du joueur sur une plage de saisons (début, fin)"""
+    return compact_frame(load_seasons(
+        read_player_matches, circuit, seasons, circuit, player_name, surface_condition, series_condition
+    ))
+
+
+def statistics_from_card(card, surfaces, data, player_name):
+    # Mêmes résultats que calculate_statistics et calculate_average_sets, lus dans la fiche
+    titles = data[(data["Winner"] == player_name) & (data["Round"] == "The Final")]
+    stats = {
+        "Nombre de matchs": card["Matches"],
+        "Nombre de victoires": card["Wins"],
+        "Nombre de défaites": card["Losses"],
+        "Titres remportés": card["Titles"],
+        "Titres en Grand Slam": card["GrandSlamTitles"],
+        "Titres par surface": pd.DataFrame(
+            [(surface, n) for surface, n, _ in surfaces if n > 0], columns=["Surface", "Titres"]
+        ),
+        "Tournois remportés": titles[["Tournament", "Series"]],
+        "Matchs en 3 sets par surface": pd.DataFrame(
+            [(surface, n) for surface, _, n in surfaces if n > 0], columns=["Surface", "Matchs en 3 sets"]
+        ),
+    }
+    # Colonne affichée dans le détail des matchs, comme avec calculate_average_sets
+    data["Sets_joués"] = data["Wsets"] + data["Lsets"]
+
+    def average(sets, matches):
+        return sets / matches if matches > 0 else 0
+
+    avg_sets_grand_slam = average(card["GrandSlamSets"], card["GrandSlamMatches"])
+    avg_sets_non_grand_slam = average(card["OtherSets"], card["OtherMatches"])
+    return stats, avg_sets_grand_slam, avg_sets_non_grand_slam
+
+
+def season_breakdown(data, player_name):
+    # Victoires, défaites et titres par saison, en une seule agrégation
+    return (
+        data.assign(
+            Victoires=data["Winner"] == player_name,
+            Défaites=data["Loser"] == player_name,
+            Titres=(data["Winner"] == player_name) & (data["Round"] == "The Final"),
+        )
+        .groupby("Saison")[["Victoires", "Défaites", "Titres"]]
+        .sum()
+        .reset_index()
+    )
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from match_store import DATA_DIR
+from tennis_api import RAPIDAPI_KEY, TennisAPI
+
+# Résolution des photos de joueurs : table persistante (circuit, nom) -> URL dans
+# photos.db. L'absence de photo est mémorisée aussi (URL NULL) et n'est recherchée
+# à nouveau qu'après NEGATIVE_TTL ; une erreur de l'API n'est jamais mémorisée.
+# Les joueurs d'une saison sont résolus en arrière-plan par lots, si bien qu'un
+# affichage courant ne fait qu'une lecture locale.
+PHOTOS_DB = os.path.join(DATA_DIR, "photos.db")
+POSITIVE_TTL = 180 * 24 * 3600
+NEGATIVE_TTL = 30 * 24 * 3600
+IMAGE_FIELDS = ["image", "profile_image", "picture", "photo"]
+
+_prefetching = set()
+_prefetched = set()
+_prefetch_lock = threading.Lock()
+
+
+def api_available() -> bool:
+    # Si la clé API est la valeur par défaut, on n'essaie pas d'appeler l'API
+    return bool(RAPIDAPI_KEY) and RAPIDAPI_KEY != "votre_cle_api_rapidapi"
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(PHOTOS_DB, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS player_photos ("
+        "circuit TEXT NOT NULL, Player TEXT NOT NULL, url TEXT, resolved REAL NOT NULL, "
+        "PRIMARY KEY (circuit, Player)) WITHOUT ROWID"
+    )
+    return conn
+
+
+def _photo_from_results(players: List[Dict], player_name: str) -> Optional[str]:
+    """URL de photo du résultat de recherche correspondant au joueur (nom exact, sinon premier résultat)"""
+    if not players:
+        return None
+    row = next((p for p in players if p.get("name") == player_name), players[0])
+    for field in IMAGE_FIELDS:
+        value = row.get(field)
+        if isinstance(value, str) and value.startswith("http"):
+            return value
+    return None
+
+
+def _known(conn: sqlite3.Connection, circuit: str, names: List[str]) -> Dict[str, Optional[str]]:
+    """Photos encore valides parmi names (None : pas de photo connue)"""
+    now = time.time()
+    known = {}
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        rows = conn.execute(
+            f"SELECT Player, url, resolved FROM player_photos WHERE circuit = ? "
+            f"AND Player IN ({','.join(['?'] * len(chunk))})",
+            [circuit, *chunk],
+        ).fetchall()
+        for player, url, resolved in rows:
+            if now - resolved < (POSITIVE_TTL if url else NEGATIVE_TTL):
+                known[player] = url
+    return known
+
+
+def _resolve(conn: sqlite3.Connection, api: TennisAPI, circuit: str, player_name: str) -> Optional[str]:
+    """Recherche la photo via l'API et mémorise le résultat, même négatif"""
+    url = _photo_from_results(api.find_players(player_name), player_name)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO player_photos VALUES (?, ?, ?, ?)",
+            (circuit, player_name, url, time.time()),
+        )
+    return url
+
+
+def photo_urls(circuit: str, player_names: Iterable[str]) -> Dict[str, Optional[str]]:
+    """URL de photo de chaque joueur (None sans photo). Seuls les joueurs jamais
+    résolus, ou dont la résolution a expiré, déclenchent un appel à l'API."""
+    names = list(dict.fromkeys(player_names))
+    if not api_available():
+        return dict.fromkeys(names)
+    try:
+        conn = _connect()
+    except sqlite3.Error:
+        return dict.fromkeys(names)
+    try:
+        urls = _known(conn, circuit, names)
+        api = TennisAPI()
+        for name in names:
+            if name not in urls:
+                try:
+                    urls[name] = _resolve(conn, api, circuit, name)
+                except Exception:
+                    # On ne bloque pas le dashboard si l'API image échoue
+                    urls[name] = None
+        return {name: urls[name] for name in names}
+    finally:
+        conn.close()
+
+
+def prefetch_photos(circuit: str, player_names: Iterable[str]) -> bool:
+    """Résout en arrière-plan les photos inconnues d'une liste de joueurs (ceux d'une
+    saison). Un seul lot par circuit à la fois ; le lot s'arrête à la première erreur
+    de l'API (quota, réseau). Retourne True si un lot a été lancé."""
+    if not api_available():
+        return False
+    names = list(dict.fromkeys(player_names))
+    batch = (circuit, hash(tuple(names)))
+    with _prefetch_lock:
+        if circuit in _prefetching or batch in _prefetched:
+            return False
+        _prefetching.add(circuit)
+
+    def run():
+        conn = None
+        try:
+            conn = _connect()
+            known = _known(conn, circuit, names)
+            api = TennisAPI()
+            for name in names:
+                if name not in known:
+                    _resolve(conn, api, circuit, name)
+            with _prefetch_lock:
+                _prefetched.add(batch)
+        except Exception:
+            pass  # Les joueurs restants seront résolus au prochain lot
+        finally:
+            if conn is not None:
+                conn.close()
+            with _prefetch_lock:
+                _prefetching.discard(circuit)
+
+    threading.Thread(target=run, daemon=True).start()
+    return True
@@ -0,0 +1,157 @@
+import bisect
+import re
+import sqlite3
+import unicodedata
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from cache import cached, side_db
+from db_pool import fetchall, table_columns
+from match_store import discover_sources, load_matches
+
+# Index de recherche approximative des noms de joueurs, toutes saisons confondues :
+# noms normalisés (sans accents ni ponctuation, en minuscules), liste triée des mots
+# pour la recherche par préfixe (dichotomie) et index inversé des trigrammes pour la
+# similarité. Construit une fois par circuit et gardé en mémoire par le cache
+# partagé (reconstruit si players.db change) ; une recherche ne lit aucune base.
+MIN_SCORE = 0.3
+EXACT_BONUS = 2.0
+PREFIX_BONUS = 1.0
+
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(name: str) -> str:
+    """'Djoković N.' -> 'djokovic n'"""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return _SEPARATORS.sub(" ", ascii_name.lower()).strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerIndex:
+    """Noms d'un circuit avec leurs saisons ; search renvoie les meilleurs candidats"""
+
+    def __init__(self, players: List[Tuple[str, frozenset]]):
+        players = sorted(players)
+        self.names = [name for name, _ in players]
+        self.seasons = [seasons for _, seasons in players]
+        self.normalized = [normalize(name) for name in self.names]
+        self.exact = {}
+        for i, key in enumerate(self.normalized):
+            self.exact.setdefault(key, i)
+        # Popularité : nombre de saisons jouées, pour départager les candidats
+        self.weight = np.array([len(s) for s in self.seasons], dtype=np.int32)
+
+        tokens = sorted((token, i) for i, key in enumerate(self.normalized) for token in key.split())
+        self.tokens = [token for token, _ in tokens]
+        self.token_owner = np.array([i for _, i in tokens], dtype=np.int32)
+
+        postings = defaultdict(list)
+        self.trigram_count = np.zeros(len(self.names), dtype=np.int32)
+        for i, key in enumerate(self.normalized):
+            grams = _trigrams(key)
+            self.trigram_count[i] = len(grams)
+            for gram in grams:
+                postings[gram].append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __sizeof__(self) -> int:
+        # Taille approximative, pour le budget mémoire du cache partagé
+        arrays = [self.weight, self.token_owner, self.trigram_count, *self.postings.values()]
+        strings = self.names + self.normalized + self.tokens
+        return sum(a.nbytes for a in arrays) + sum(len(x) + 49 for x in strings) + 200 * len(self.names)
+
+    def season_names(self, season: int) -> List[str]:
+        """Noms triés des joueurs ayant joué la saison"""
+        return [name for name, seasons in zip(self.names, self.seasons) if season in seasons]
+
+    def _prefix_owners(self, prefix: str) -> np.ndarray:
+        start = bisect.bisect_left(self.tokens, prefix)
+        end = bisect.bisect_left(self.tokens, prefix + "\x7f", lo=start)
+        return np.unique(self.token_owner[start:end])
+
+    def search(self, query: str, limit: int = 10, season: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(nom, score) des joueurs les plus proches de query, du meilleur au moins bon.
+        Score : similarité des trigrammes (0 à 1), plus un bonus par mot de la requête
+        qui commence un mot du nom, plus un bonus si le nom normalisé est identique."""
+        key = normalize(query)
+        if not key or not self.names:
+            return []
+        grams = [g for g in _trigrams(key) if g in self.postings]
+        shared = np.bincount(
+            np.concatenate([self.postings[g] for g in grams]) if grams else np.empty(0, dtype=np.int32),
+            minlength=len(self.names),
+        )
+        scores = shared / (len(_trigrams(key)) + self.trigram_count - shared)
+        words = key.split()
+        for word in words:
+            scores[self._prefix_owners(word)] += PREFIX_BONUS / len(words)
+        if key in self.exact:
+            scores[self.exact[key]] += EXACT_BONUS
+
+        candidates = np.flatnonzero(scores >= MIN_SCORE)
+        if season is not None:
+            candidates = np.array([i for i in candidates if season in self.seasons[i]], dtype=np.int64)
+        if not len(candidates):
+            return []
+        # Tri par score décroissant, puis popularité, puis ordre alphabétique (ordre des indices)
+        order = np.lexsort((candidates, -self.weight[candidates], -scores[candidates]))[:limit]
+        return [(self.names[i], float(scores[i])) for i in candidates[order]]
+
+
+def _players_from_dictionary(circuit: str) -> Optional[List[Tuple[str, frozenset]]]:
+    """Joueurs et saisons lus dans players.db, None si le dictionnaire est absent"""
+    path = side_db("players.db")
+    if not table_columns(path, "player_seasons"):
+        return None
+    rows = fetchall(
+        path,
+        """
+        SELECT p.name, group_concat(s.season) FROM players p
+        LEFT JOIN player_seasons s USING (player_id)
+        WHERE p.circuit = ? GROUP BY p.player_id
+        """,
+        (circuit,),
+    )
+    return [(name, frozenset(int(s) for s in (seasons or "").split(",") if s)) for name, seasons in rows]
+
+
+def _players_from_store(circuit: str) -> List[Tuple[str, frozenset]]:
+    """Joueurs et saisons calculés depuis les matchs (players.db absent)"""
+    seasons = sorted(season for (c, season) in discover_sources() if c == circuit)
+    try:
+        matches = load_matches(circuit, seasons, columns=["Winner", "Loser", "season"])
+    except FileNotFoundError:
+        return []
+    sides = np.concatenate([matches["Winner"].to_numpy(), matches["Loser"].to_numpy()])
+    years = np.concatenate([matches["season"].to_numpy(), matches["season"].to_numpy()])
+    players = defaultdict(set)
+    for name, year in zip(sides, years):
+        if isinstance(name, str) and name.strip():
+            players[name.strip()].add(int(year))
+    return [(name, frozenset(years)) for name, years in players.items()]
+
+
+@cached(files=lambda circuit: [side_db("players.db")], copy_result=False)
+def player_index(circuit: str) -> PlayerIndex:
+    """Index des joueurs d'un circuit, construit au premier appel puis gardé en mémoire"""
+    circuit = circuit.lower()
+    try:
+        players = _players_from_dictionary(circuit)
+    except sqlite3.Error:
+        players = None
+    return PlayerIndex(players if players is not None else _players_from_store(circuit))
+
+
+def search_players(query: str, circuit: str, limit: int = 10, season: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Noms les plus proches de query sur le circuit (ou parmi les joueurs d'une saison)"""
+    return player_index(circuit.lower()).search(query, limit, season)
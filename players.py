@@ -0,0 +1,172 @@
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+from db_pool import fetchall, table_columns
+
+# Dictionnaire des joueurs partagé par toutes les saisons et les deux circuits :
+# chaque nom (nettoyé des espaces) reçoit un identifiant entier stable, attribué
+# à l'ingestion. Les tables data stockent WinnerID / LoserID ; filtres, jointures
+# et regroupements se font sur ces entiers plutôt que sur les noms.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "Data_Base_Tennis")
+
+_SEASON_FILE = re.compile(r"^(atp|wta)_(\d{4})\.db$")
+
+_PLAYERS_DDL = """
+CREATE TABLE IF NOT EXISTS players (
+    player_id INTEGER PRIMARY KEY,
+    circuit TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (circuit, name)
+)
+"""
+_PLAYER_SEASONS_DDL = """
+CREATE TABLE IF NOT EXISTS player_seasons (
+    player_id INTEGER NOT NULL,
+    season INTEGER NOT NULL,
+    PRIMARY KEY (season, player_id)
+) WITHOUT ROWID
+"""
+
+
+def players_db_path(data_dir: Optional[str] = None) -> str:
+    return os.path.join(data_dir or DATA_DIR, "players.db")
+
+
+def season_from_db_file(db_file: str) -> Optional[tuple]:
+    """(circuit, saison) d'après le nom d'une base {circuit}_{saison}.db, None sinon"""
+    match = _SEASON_FILE.match(os.path.basename(db_file))
+    if not match:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def intern_players(circuit: str, season: int, names: Iterable[str], players_db: Optional[str] = None) -> Dict[str, int]:
+    """Enregistre les noms dans le dictionnaire et retourne {nom nettoyé: player_id}"""
+    names = sorted({str(n).strip() for n in names if n is not None and str(n).strip()})
+    # Plusieurs processus (reconstruction parallèle) peuvent écrire en même temps
+    conn = sqlite3.connect(players_db or players_db_path(), timeout=60)
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(_PLAYERS_DDL)
+            conn.execute(_PLAYER_SEASONS_DDL)
+            conn.executemany(
+                "INSERT OR IGNORE INTO players (circuit, name) VALUES (?, ?)", ((circuit, n) for n in names)
+            )
+            ids = {}
+            for start in range(0, len(names), 500):
+                chunk = names[start:start + 500]
+                placeholders = ",".join(["?"] * len(chunk))
+                ids.update(conn.execute(
+                    f"SELECT name, player_id FROM players WHERE circuit = ? AND name IN ({placeholders})",
+                    [circuit, *chunk],
+                ))
+            conn.executemany(
+                "INSERT OR IGNORE INTO player_seasons VALUES (?, ?)", ((pid, season) for pid in ids.values())
+            )
+    finally:
+        conn.close()
+    return ids
+
+
+def assign_player_ids(conn: sqlite3.Connection, db_file: str) -> int:
+    """Renseigne WinnerID / LoserID des matchs qui n'en ont pas encore, sans commit.
+
+    Retourne le nombre de noms traités (0 si le fichier n'est pas une base saison).
+    """
+    season = season_from_db_file(db_file)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(data)")}
+    if season is None or not {"Winner", "Loser"} <= columns:
+        return 0
+    for col in ("WinnerID", "LoserID"):
+        if col not in columns:
+            conn.execute(f"ALTER TABLE data ADD COLUMN {col} INTEGER")
+
+    pending = [
+        row[0] for row in conn.execute(
+            "SELECT Winner FROM data WHERE WinnerID IS NULL UNION SELECT Loser FROM data WHERE LoserID IS NULL"
+        ) if row[0] is not None
+    ]
+    if not pending:
+        return 0
+    ids = intern_players(*season, pending, players_db_path(os.path.dirname(os.path.abspath(db_file))))
+    # Table de correspondance temporaire : une seule passe sur data par colonne
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS player_map (name TEXT PRIMARY KEY, player_id INTEGER)")
+    conn.execute("DELETE FROM temp.player_map")
+    conn.executemany(
+        "INSERT INTO temp.player_map VALUES (?, ?)",
+        ((name, ids[name.strip()]) for name in pending if name.strip() in ids),
+    )
+    for name_col, id_col in (("Winner", "WinnerID"), ("Loser", "LoserID")):
+        conn.execute(
+            f"UPDATE data SET {id_col} = (SELECT player_id FROM temp.player_map WHERE name = data.{name_col}) "
+            f"WHERE {id_col} IS NULL"
+        )
+    conn.execute("DROP TABLE temp.player_map")
+    return len(pending)
+
+
+def player_ids(circuit: str, names: Iterable[str]) -> Dict[str, int]:
+    """{nom: player_id} pour les noms connus du dictionnaire"""
+    names = [str(n) for n in names]
+    if not names:
+        return {}
+    placeholders = ",".join(["?"] * len(names))
+    try:
+        rows = fetchall(
+            players_db_path(),
+            f"SELECT name, player_id FROM players WHERE circuit = ? AND name IN ({placeholders})",
+            [circuit.lower(), *names],
+        )
+    except sqlite3.Error:
+        return {}
+    return dict(rows)
+
+
+def player_id(circuit: str, name: str) -> Optional[int]:
+    return player_ids(circuit, [name]).get(name)
+
+
+def player_names(circuit: str, ids: Iterable[int]) -> Dict[int, str]:
+    """{player_id: nom}, pour réafficher des résultats calculés sur les identifiants"""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return {}
+    placeholders = ",".join(["?"] * len(ids))
+    try:
+        return dict(fetchall(
+            players_db_path(),
+            f"SELECT player_id, name FROM players WHERE circuit = ? AND player_id IN ({placeholders})",
+            [circuit.lower(), *ids],
+        ))
+    except sqlite3.Error:
+        return {}
+
+
+def season_players(circuit: str, season: int) -> List[str]:
+    """Noms triés des joueurs ayant disputé au moins un match dans la saison"""
+    try:
+        rows = fetchall(
+            players_db_path(),
+            """
+            SELECT p.name FROM player_seasons s JOIN players p USING (player_id)
+            WHERE s.season = ? AND p.circuit = ?
+            ORDER BY p.name
+            """,
+            (int(season), circuit.lower()),
+        )
+    except sqlite3.Error:
+        return []
+    return [row[0] for row in rows]
+
+
+def player_clause(file_path: str, circuit: str, player_name: str) -> tuple:
+    """Condition SQL (texte, paramètres) sélectionnant les matchs d'un joueur dans data :
+    sur les identifiants entiers si la base en dispose, sinon sur le nom."""
+    pid = player_id(circuit, player_name)
+    if pid is not None and "WinnerID" in table_columns(file_path, "data"):
+        return "(WinnerID = ? OR LoserID = ?)", (pid, pid)
+    return "(Winner = ? OR Loser = ?)", (player_name, player_name)
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+from typing import List, Optional
+
+import pandas as pd
+
+from db_pool import read_sql, table_columns
+from match_store import DATA_DIR, discover_sources, load_matches
+from players import season_from_db_file
+
+# Historique des classements reconstruit à partir des matchs : chaque match donne le
+# rang et les points des deux joueurs à sa date. Une ligne par (joueur, semaine),
+# la plus récente de la semaine, dans la base partagée rankings.db. La clé primaire
+# (circuit, Player, Week) range l'historique d'un joueur de façon contiguë et
+# l'index (circuit, Week, Rank) sert les classements à une date : deux recherches
+# dichotomiques dans les B-arbres de SQLite, sans appel à l'API.
+_RANKING_DDL = """
+CREATE TABLE IF NOT EXISTS ranking_history (
+    circuit TEXT NOT NULL, Player TEXT NOT NULL, Week TEXT NOT NULL,
+    Date TEXT, season INTEGER, Rank INTEGER, Points INTEGER,
+    PRIMARY KEY (circuit, Player, Week)
+) WITHOUT ROWID
+"""
+_RANKING_COLUMNS = ["circuit", "Player", "Week", "Date", "season", "Rank", "Points"]
+
+# Un joueur sans match depuis STALE_WEEKS semaines ne figure plus au classement
+STALE_WEEKS = 8
+
+
+def rankings_db_path(data_dir: Optional[str] = None) -> str:
+    return os.path.join(data_dir or DATA_DIR, "rankings.db")
+
+
+def ranking_frame(circuit: str, season: int, matches: pd.DataFrame) -> pd.DataFrame:
+    """Lignes ranking_history d'une saison : dernier rang connu de chaque joueur par
+    semaine (semaines commençant le lundi, dates au format ISO)"""
+    sides = pd.concat([
+        matches[["Date", "Winner", "WRank", "WPts"]].set_axis(["Date", "Player", "Rank", "Points"], axis=1),
+        matches[["Date", "Loser", "LRank", "LPts"]].set_axis(["Date", "Player", "Rank", "Points"], axis=1),
+    ], ignore_index=True)
+    sides["Date"] = pd.to_datetime(sides["Date"], errors="coerce")
+    sides["Rank"] = pd.to_numeric(sides["Rank"], errors="coerce")
+    sides["Points"] = pd.to_numeric(sides["Points"], errors="coerce")
+    sides = sides[sides["Player"].notna() & sides["Date"].notna() & sides["Rank"].notna()]
+    sides["Player"] = sides["Player"].astype(str).str.strip()
+    sides["Week"] = (sides["Date"] - pd.to_timedelta(sides["Date"].dt.weekday, unit="D")).dt.strftime("%Y-%m-%d")
+
+    weekly = sides.sort_values("Date", kind="stable").drop_duplicates(["Player", "Week"], keep="last")
+    weekly = weekly.assign(circuit=circuit, season=season, Date=weekly["Date"].dt.strftime("%Y-%m-%d"))
+    weekly = weekly.astype({"Rank": "int64"}).astype({"Points": "Int64"})
+    return weekly.sort_values(["Player", "Week"], ignore_index=True)[_RANKING_COLUMNS]
+
+
+def update_rankings(conn: sqlite3.Connection, db_file: str) -> int:
+    """Remplace la saison de db_file dans l'historique des classements. Une semaine
+    partagée avec une autre saison (fin décembre) garde le rang le plus récent."""
+    season = season_from_db_file(db_file)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(data)")}
+    if season is None or not {"Date", "Winner", "Loser", "WRank", "LRank"} <= columns:
+        return 0
+    circuit, year = season
+    points = ", ".join(c if c in columns else f"NULL AS {c}" for c in ("WPts", "LPts"))
+    frame = ranking_frame(
+        circuit, year, pd.read_sql_query(f"SELECT Date, Winner, Loser, WRank, LRank, {points} FROM data", conn)
+    )
+    rows = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+
+    # Plusieurs processus (reconstruction parallèle) peuvent écrire en même temps
+    index = sqlite3.connect(rankings_db_path(os.path.dirname(os.path.abspath(db_file))), timeout=60)
+    try:
+        with index:
+            index.execute("BEGIN IMMEDIATE")
+            index.execute(_RANKING_DDL)
+            index.execute("CREATE INDEX IF NOT EXISTS idx_ranking_week ON ranking_history (circuit, Week, Rank)")
+            index.execute("DELETE FROM ranking_history WHERE circuit = ? AND season = ?", (circuit, year))
+            index.executemany(
+                f"""
+                INSERT INTO ranking_history VALUES ({','.join(['?'] * len(_RANKING_COLUMNS))})
+                ON CONFLICT (circuit, Player, Week) DO UPDATE SET
+                    Date = excluded.Date, season = excluded.season, Rank = excluded.Rank, Points = excluded.Points
+                WHERE excluded.Date >= ranking_history.Date
+                """,
+                rows,
+            )
+    finally:
+        index.close()
+    return len(frame)
+
+
+def _history_from_store(circuit: str) -> pd.DataFrame:
+    """Historique complet calculé depuis les matchs (rankings.db absent)"""
+    seasons = sorted(season for (c, season) in discover_sources() if c == circuit)
+    try:
+        matches = load_matches(circuit, seasons, columns=["Date", "Winner", "Loser", "WRank", "LRank", "WPts", "LPts"])
+    except FileNotFoundError:
+        return pd.DataFrame(columns=_RANKING_COLUMNS)
+    frame = ranking_frame(circuit, 0, matches.assign(Date=matches["Date"].astype(str)))
+    return frame.drop(columns="season")
+
+
+def ranking_history(circuit: str, players: List[str], start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """Rang et points hebdomadaires des joueurs entre start et end (dates ISO incluses)"""
+    circuit = circuit.lower()
+    start, end = start or "0000-00-00", end or "9999-99-99"
+    path = rankings_db_path()
+    if table_columns(path, "ranking_history"):
+        placeholders = ",".join(["?"] * len(players))
+        return read_sql(
+            path,
+            f"""
+            SELECT Player, Week, Date, Rank, Points FROM ranking_history
+            WHERE circuit = ? AND Player IN ({placeholders}) AND Week BETWEEN ? AND ?
+            ORDER BY Player, Week
+            """,
+            [circuit, *players, start, end],
+        )
+    history = _history_from_store(circuit)
+    history = history[history["Player"].isin(players) & history["Week"].between(start, end)]
+    return history[["Player", "Week", "Date", "Rank", "Points"]].reset_index(drop=True)
+
+
+def top_at_date(circuit: str, date: str, n: int = 10) -> pd.DataFrame:
+    """Top n à une date (ISO). Chaque joueur ayant joué dans les STALE_WEEKS semaines
+    précédentes n'est compté qu'une fois, avec sa dernière observation ; les joueurs
+    sont reclassés par points (puis rang observé), d'où des rangs uniques."""
+    circuit = circuit.lower()
+    end = pd.Timestamp(date)
+    start = (end - pd.Timedelta(weeks=STALE_WEEKS)).strftime("%Y-%m-%d")
+    end = end.strftime("%Y-%m-%d")
+    path = rankings_db_path()
+    if table_columns(path, "ranking_history"):
+        # Colonnes nues avec MAX() : SQLite renvoie la ligne de la semaine la plus récente
+        return read_sql(
+            path,
+            """
+            SELECT Player, ROW_NUMBER() OVER (ORDER BY Points IS NULL, Points DESC, Rank, Date DESC) AS Rank,
+                   Points, Date
+            FROM (
+                SELECT Player, Rank, Points, Date, MAX(Week) FROM ranking_history
+                WHERE circuit = ? AND Week BETWEEN ? AND ? AND Date <= ? GROUP BY Player
+            ) ORDER BY Rank LIMIT ?
+            """,
+            (circuit, start, end, end, int(n)),
+        )
+    history = _history_from_store(circuit)
+    history = history[history["Week"].between(start, end) & (history["Date"] <= end)]
+    latest = history.sort_values("Week").drop_duplicates("Player", keep="last")
+    latest = latest.sort_values(["Points", "Rank", "Date"], ascending=[False, True, False], na_position="last")
+    latest = latest.head(n).assign(Rank=range(1, min(n, len(latest)) + 1))
+    return latest[["Player", "Rank", "Points", "Date"]].reset_index(drop=True)
@@ -0,0 +1,54 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Moteur de forme glissante : pour chaque match d'un joueur (une ligne par joueur et
+# par match, comme player_matches), taux de victoires sur ses N derniers matchs et
+# sur ses N derniers jours, match courant inclus. Un seul tri puis des sommes
+# cumulées : chaque fenêtre est une différence de deux sommes, bornée au début du
+# groupe (joueur, ou joueur et surface) ; les bornes en jours sont trouvées par
+# recherche dichotomique sur une clé (groupe, jour).
+DEFAULT_WINDOW = 10
+DEFAULT_DAYS = 90
+
+
+def rolling_form(
+    matches: pd.DataFrame,
+    window: int = DEFAULT_WINDOW,
+    days: Optional[int] = None,
+    by_surface: bool = False,
+) -> pd.DataFrame:
+    """Ajoute à matches (colonnes Player, Date, Result, et Surface si by_surface) :
+    MatchNumber (rang du match dans le groupe), Form (taux de victoires sur les
+    window derniers matchs) et, si days est donné, FormDays (sur les days derniers jours).
+
+    Le résultat est trié par groupe puis par date ; les lignes sans date sont écartées.
+    """
+    keys = ["Player", "Surface"] if by_surface else ["Player"]
+    frame = matches.assign(Date=pd.to_datetime(matches["Date"], errors="coerce"))
+    group = frame.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+    keep = (group >= 0) & frame["Date"].notna().to_numpy()
+    frame, group = frame[keep], group[keep]
+
+    # Tri stable par (groupe, date) : les matchs d'un même jour gardent leur ordre
+    order = np.lexsort((np.arange(len(frame)), frame["Date"].to_numpy(), group))
+    frame, group = frame.iloc[order].reset_index(drop=True), group[order]
+
+    wins = (frame["Result"] == "Victoire").to_numpy(dtype=float)
+    total = np.concatenate([[0.0], np.cumsum(wins)])
+    position = np.arange(len(frame))
+    start = np.searchsorted(group, group, side="left")
+
+    left = np.maximum(start, position - window + 1)
+    frame["MatchNumber"] = position - start + 1
+    frame["Form"] = (total[position + 1] - total[left]) / (position - left + 1)
+
+    if days is not None and len(frame):
+        day = frame["Date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        day -= day.min()
+        key = group.astype(np.int64) * (int(day.max()) + days + 1) + day
+        # Fenêtre ]jour - days, jour] : la borne ne sort jamais du groupe
+        left = np.searchsorted(key, key - days + 1, side="left")
+        frame["FormDays"] = (total[position + 1] - total[left]) / (position - left + 1)
+    return frame
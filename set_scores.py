@@ -0,0 +1,103 @@
+import sqlite3
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Moteur de scores de sets : W1..W5 / L1..L5 deviennent une matrice
+# (n_matchs x 5 sets x 2 joueurs), indice 0 = vainqueur, 1 = perdant, NaN pour
+# un set non joué. Les caractéristiques de match s'en déduisent en quelques
+# opérations vectorisées et sont stockées comme colonnes dérivées de data.
+MAX_SETS = 5
+SET_COLUMNS = [(f"W{i}", f"L{i}") for i in range(1, MAX_SETS + 1)]
+
+# Tiebreaks / Bagels / Breadsticks : nombre de sets 7-6 / 6-0 / 6-1 du match ;
+# DecidingSet : match allé au set décisif ; Comeback : vainqueur qui a perdu le premier set.
+FEATURE_COLUMNS = ["Tiebreaks", "Bagels", "Breadsticks", "DecidingSet", "Comeback"]
+
+
+def set_score_matrix(matches: pd.DataFrame) -> np.ndarray:
+    """Jeux par set sous forme de matrice float (n, 5, 2)"""
+    scores = np.full((len(matches), MAX_SETS, 2), np.nan)
+    for i, pair in enumerate(SET_COLUMNS):
+        for side, col in enumerate(pair):
+            if col in matches.columns:
+                scores[:, i, side] = pd.to_numeric(matches[col], errors="coerce").to_numpy(dtype=float)
+    return scores
+
+
+def match_features(matches: pd.DataFrame) -> pd.DataFrame:
+    """Caractéristiques FEATURE_COLUMNS de chaque match, alignées sur l'index de matches"""
+    scores = set_score_matrix(matches)
+    high = scores.max(axis=2)
+    low = scores.min(axis=2)
+    played = (~np.isnan(scores).any(axis=2)).sum(axis=1)
+    # Set terminé : 6 jeux et deux d'écart, ou 7-6 ; un set interrompu (abandon) ne compte pas
+    complete = (high >= 6) & ((high - low >= 2) | ((high == 7) & (low == 6)))
+    won = (complete & (scores[:, :, 0] > scores[:, :, 1])).sum(axis=1)
+    lost = (complete & (scores[:, :, 0] < scores[:, :, 1])).sum(axis=1)
+
+    # Set décisif atteint : autant de sets joués que le format le permet ("Best of"),
+    # sinon d'après le score en sets
+    deciding = (won >= 2) & (lost == won - 1)
+    if "Best of" in matches.columns:
+        best_of = pd.to_numeric(matches["Best of"], errors="coerce").to_numpy(dtype=float)
+        deciding = np.where(np.isnan(best_of), deciding, played == best_of)
+
+    return pd.DataFrame(
+        {
+            "Tiebreaks": ((high == 7) & (low == 6)).sum(axis=1).astype("int8"),
+            "Bagels": ((high == 6) & (low == 0)).sum(axis=1).astype("int8"),
+            "Breadsticks": ((high == 6) & (low == 1)).sum(axis=1).astype("int8"),
+            "DecidingSet": deciding.astype(bool),
+            "Comeback": complete[:, 0] & (scores[:, 0, 1] > scores[:, 0, 0]),
+        },
+        index=matches.index,
+    )
+
+
+def with_match_features(matches: pd.DataFrame) -> pd.DataFrame:
+    """Ajoute les colonnes dérivées absentes ou vides (base ou partition antérieure
+    au moteur) à un DataFrame de matchs"""
+    missing = [col for col in FEATURE_COLUMNS if col not in matches.columns or matches[col].isna().all()]
+    if not missing:
+        return matches
+    return matches.assign(**match_features(matches)[missing])
+
+
+def store_match_features(conn: sqlite3.Connection, match_ids: Optional[Iterable[int]] = None) -> int:
+    """Calcule et enregistre les colonnes dérivées de data, dans la transaction en cours.
+
+    match_ids limite le calcul aux matchs donnés (ingestion incrémentale) ; les
+    matchs sans caractéristiques sont toujours traités.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(data)")]
+    if not columns:
+        return 0
+    for col in FEATURE_COLUMNS:
+        if col not in columns:
+            conn.execute(f"ALTER TABLE data ADD COLUMN {col} INTEGER")
+
+    score_columns = [c for pair in SET_COLUMNS for c in pair if c in columns]
+    if "Best of" in columns:
+        score_columns.append("Best of")
+    selected = ", ".join(["rowid AS match_id"] + [f'"{c}"' for c in score_columns])
+    if match_ids is None:
+        matches = pd.read_sql_query(f"SELECT {selected} FROM data", conn)
+    else:
+        # Table temporaire : évite une liste IN (...) de taille arbitraire
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS feature_ids (match_id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.feature_ids")
+        conn.executemany("INSERT OR IGNORE INTO temp.feature_ids VALUES (?)", ((i,) for i in match_ids))
+        matches = pd.read_sql_query(
+            f"SELECT {selected} FROM data WHERE Tiebreaks IS NULL OR rowid IN (SELECT match_id FROM temp.feature_ids)",
+            conn,
+        )
+        conn.execute("DROP TABLE temp.feature_ids")
+
+    features = match_features(matches).astype("int64")
+    conn.executemany(
+        f"UPDATE data SET {', '.join(f'{col} = ?' for col in FEATURE_COLUMNS)} WHERE rowid = ?",
+        zip(*(features[col].tolist() for col in FEATURE_COLUMNS), matches["match_id"].tolist()),
+    )
+    return len(matches)
@@ -2,14 +2,112 @@ import requests
 import pandas as pd
 import streamlit as st
 from datetime import datetime, timedelta
+import json
 import os
+import sqlite3
+import threading
+import time
 from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
 
 # Configuration de l'API (à remplacer par votre clé API)
 # Inscrivez-vous sur https://rapidapi.com/tipsters/api/tennisapi1/ pour obtenir une clé
 RAPIDAPI_KEY = os.getenv('TENNIS_API_KEY', 'votre_cle_api_rapidapi')
 RAPIDAPI_HOST = "tennisapi1.p.rapidapi.com"
 
+# Cache persistant des réponses (fichier SQLite partagé par les sessions et les
+# redémarrages), par URL et paramètres. Chaque point d'accès a une durée de
+# fraîcheur et une fenêtre de péremption (secondes) : une réponse fraîche est
+# servie sans appel réseau ; une réponse périmée dans la fenêtre est servie
+# immédiatement et rafraîchie en arrière-plan ; au-delà, l'appel est synchrone.
+# Si l'API échoue, la dernière réponse connue est servie quel que soit son âge.
+API_CACHE_PATH = os.getenv(
+    'TENNIS_API_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data_Base_Tennis', 'api_cache.db')
+)
+CACHE_POLICIES = {
+    'live': (15, 45),
+    'rankings': (6 * 3600, 24 * 3600),
+    'tournaments': (12 * 3600, 24 * 3600),
+    'player_stats': (24 * 3600, 7 * 24 * 3600),
+    'search': (7 * 24 * 3600, 30 * 24 * 3600),
+}
+
+
+class ResponseCache:
+    """Réponses JSON de l'API stockées dans un fichier SQLite"""
+
+    def __init__(self, path: str = API_CACHE_PATH):
+        self.path = path
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, endpoint TEXT, body TEXT NOT NULL, fetched REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None) -> str:
+        return f"{url}?{urlencode(sorted((params or {}).items()))}"
+
+    def get(self, key: str) -> Optional[Tuple[object, float]]:
+        """(réponse, âge en secondes), None si absente"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT body, fetched FROM responses WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def put(self, key: str, endpoint: str, body) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, endpoint, json.dumps(body), time.time()),
+                )
+        finally:
+            conn.close()
+
+    def refresh_in_background(self, key: str, endpoint: str, fetch) -> None:
+        """Rafraîchit une réponse périmée dans un thread, une seule fois à la fois par clé"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.put(key, endpoint, fetch())
+            except Exception:
+                pass  # La réponse périmée reste servie, nouvel essai au prochain appel
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def response_cache() -> ResponseCache:
+    """Cache des réponses partagé par le processus, créé au premier appel"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
 class TennisAPI:
     """Classe pour interagir avec l'API de données de tennis"""
     
@@ -19,6 +117,33 @@ class TennisAPI:
             'x-rapidapi-host': RAPIDAPI_HOST
         }
         self.base_url = f"https://{RAPIDAPI_HOST}"
+
+    def _request(self, url: str, params: Optional[Dict] = None):
+        response = requests.get(url, headers=self.headers, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _get_json(self, endpoint: str, url: str, params: Optional[Dict] = None):
+        """Réponse JSON de l'API en passant par le cache persistant (politique CACHE_POLICIES[endpoint])"""
+        cache = response_cache()
+        key = cache.key(url, params)
+        fresh_for, stale_for = CACHE_POLICIES[endpoint]
+        cached = cache.get(key)
+        if cached is not None:
+            body, age = cached
+            if age < fresh_for:
+                return body
+            if age < fresh_for + stale_for:
+                cache.refresh_in_background(key, endpoint, lambda: self._request(url, params))
+                return body
+        try:
+            body = self._request(url, params)
+        except Exception:
+            if cached is not None:
+                return cached[0]
+            raise
+        cache.put(key, endpoint, body)
+        return body
     
     def get_ranking(self, ranking_type: str = 'atp', limit: int = 100) -> pd.DataFrame:
         """Récupère le classement ATP/WTA"""
@@ -26,9 +151,7 @@ class TennisAPI:
         querystring = {"limit": str(limit)}
         
         try:
-            response = requests.get(url, headers=self.headers, params=querystring)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json('rankings', url, querystring)
             
             if 'rankings' in data:
                 return pd.DataFrame(data['rankings'])
@@ -43,9 +166,7 @@ class TennisAPI:
         url = f"{self.base_url}/api/tennis/player/{player_id}/stats"
         
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json('player_stats', url)
         except Exception as e:
             st.error(f"Erreur lors de la récupération des statistiques du joueur: {e}")
             return {}
@@ -55,9 +176,7 @@ class TennisAPI:
         url = f"{self.base_url}/api/tennis/event/live"
         
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json('live', url)
             return data.get('events', [])
         except Exception as e:
             st.error(f"Erreur lors de la récupération des matchs en direct: {e}")
@@ -80,9 +199,7 @@ class TennisAPI:
         }
         
         try:
-            response = requests.get(url, headers=self.headers, params=querystring)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json('tournaments', url, querystring)
             
             if 'tournaments' in data:
                 return pd.DataFrame(data['tournaments'])
@@ -92,19 +209,16 @@ class TennisAPI:
             st.error(f"Erreur lors de la récupération des tournois: {e}")
             return pd.DataFrame()
     
+    def find_players(self, query: str) -> List[Dict]:
+        """Recherche des joueurs par nom ; les erreurs de l'API sont propagées"""
+        url = f"{self.base_url}/api/tennis/search/players"
+        data = self._get_json('search', url, {"query": query})
+        return data.get('players', [])
+
     def search_players(self, query: str) -> pd.DataFrame:
         """Recherche des joueurs par nom"""
-        url = f"{self.base_url}/api/tennis/search/players"
-        querystring = {"query": query}
-        
         try:
-            response = requests.get(url, headers=self.headers, params=querystring)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'players' in data:
-                return pd.DataFrame(data['players'])
-            return pd.DataFrame()
+            return pd.DataFrame(self.find_players(query))
             
         except Exception as e:
             st.error(f"Erreur lors de la recherche de joueurs: {e}")
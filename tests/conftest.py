@@ -0,0 +1,62 @@
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cache  # noqa: E402
+import elo  # noqa: E402
+import head_to_head  # noqa: E402
+import match_store  # noqa: E402
+import players  # noqa: E402
+import rankings  # noqa: E402
+from xlsx_to_db import migrate_databases  # noqa: E402
+
+SOURCE_DIR = os.path.join(ROOT, "Data_Base_Tennis")
+# atp_2019 contient des noms avec espace final ('Djokovic N. ') ; la même variante
+# est ajoutée dans wta_2019 pour quelques matchs de WTA_VARIANT
+SEASONS = ["atp_2019.db", "atp_2020.db", "wta_2019.db"]
+WTA_VARIANT = "Barty A."
+_DATA_DIR_MODULES = (match_store, players, cache, rankings, elo, head_to_head)
+
+
+def use_data_dir(mp: pytest.MonkeyPatch, data_dir: str) -> None:
+    """Fait pointer les modules sur un dossier de données de test"""
+    for module in _DATA_DIR_MODULES:
+        mp.setattr(module, "DATA_DIR", data_dir)
+    mp.setattr(match_store, "STORE_DIR", os.path.join(data_dir, "match_store"))
+    cache.clear_all()
+
+
+@pytest.fixture(scope="session")
+def migrated_dir(tmp_path_factory):
+    """Copie migrée (identifiants, tables dérivées, bases annexes) de quelques saisons"""
+    data_dir = str(tmp_path_factory.mktemp("data"))
+    for name in SEASONS:
+        shutil.copy(os.path.join(SOURCE_DIR, name), data_dir)
+    with sqlite3.connect(os.path.join(data_dir, "wta_2019.db")) as conn:
+        conn.execute(
+            "UPDATE data SET Winner = Winner || ' ' WHERE rowid IN "
+            "(SELECT rowid FROM data WHERE Winner = ? LIMIT 2)", (WTA_VARIANT,)
+        )
+        conn.execute(
+            "UPDATE data SET Loser = Loser || ' ' WHERE rowid IN "
+            "(SELECT rowid FROM data WHERE Loser = ? LIMIT 1)", (WTA_VARIANT,)
+        )
+    mp = pytest.MonkeyPatch()
+    use_data_dir(mp, data_dir)
+    migrate_databases([os.path.join(data_dir, name) for name in SEASONS])
+    yield data_dir
+    mp.undo()
+    cache.clear_all()
+
+
+@pytest.fixture
+def data_dir(migrated_dir, monkeypatch):
+    use_data_dir(monkeypatch, migrated_dir)
+    yield migrated_dir
+    cache.clear_all()
@@ -0,0 +1,35 @@
+import os
+import sqlite3
+
+import cache
+from elo import season_ratings
+
+
+def _stats(name):
+    stats = cache.cache_stats().set_index("Function")
+    return stats.loc[name, ["Misses", "Stale"]].tolist()
+
+
+def test_api_and_photo_caches_do_not_invalidate_loaders(data_dir):
+    name = "elo.season_ratings"
+    season_ratings("atp")
+    before = _stats(name)
+    for side in ("photos.db", "api_cache.db"):
+        with sqlite3.connect(os.path.join(data_dir, side)) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS t (x)")
+            conn.execute("INSERT INTO t VALUES (1)")
+    season_ratings("atp")
+    assert _stats(name) == before
+
+    # Une dépendance réelle qui change invalide l'entrée
+    elo_db = os.path.join(data_dir, "elo.db")
+    stat = os.stat(elo_db)
+    os.utime(elo_db, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    season_ratings("atp")
+    assert _stats(name) == [before[0] + 1, before[1] + 1]
+
+
+def test_default_signature_ignores_api_and_photo_caches(data_dir):
+    names = [entry[0] for entry in cache.data_dir_signature()]
+    assert "atp_2019.db" in names and "elo.db" in names
+    assert "photos.db" not in names and "api_cache.db" not in names
@@ -0,0 +1,61 @@
+import os
+import sqlite3
+
+import pytest
+
+import atp_dashboard
+import wta_dashboard
+from conftest import WTA_VARIANT
+from derived_tables import load_player_card
+from player_dashboard import load_career_data, season_breakdown
+
+
+@pytest.mark.parametrize("module, season, player, matches", [
+    (atp_dashboard, "atp_2019.db", "Djokovic N.", 66),
+    (wta_dashboard, "wta_2019.db", WTA_VARIANT, 64),
+])
+def test_wins_and_losses_cover_every_match_of_a_name_variant(data_dir, module, season, player, matches):
+    # La clause par identifiant ramène aussi les matchs enregistrés sous 'Nom ' (espace final)
+    data = module.load_data(os.path.join(data_dir, season), player)
+    stats = module.calculate_statistics(data, player)
+    assert stats["Nombre de matchs"] == matches
+    assert stats["Nombre de victoires"] + stats["Nombre de défaites"] == matches
+
+
+def _comparable(stats, avg_grand_slam, avg_other):
+    frames = {k: v.reset_index(drop=True) for k, v in stats.items() if hasattr(v, "columns")}
+    numbers = {k: int(v) for k, v in stats.items() if k not in frames}
+    return numbers, frames, (round(float(avg_grand_slam), 4), round(float(avg_other), 4))
+
+
+@pytest.mark.parametrize("module, circuit, season", [
+    (atp_dashboard, "atp", 2019),
+    (wta_dashboard, "wta", 2019),
+])
+def test_player_cards_match_computed_statistics(data_dir, module, circuit, season):
+    file_path = os.path.join(data_dir, f"{circuit}_{season}.db")
+    names = [row[0] for row in sqlite3.connect(file_path).execute("SELECT Player FROM player_cards")]
+    assert names
+    mismatches = []
+    for name in names:
+        data = module.load_data(file_path, name)
+        card = load_player_card(circuit, season, name)
+        computed = _comparable(
+            module.calculate_statistics(data, name), *module.calculate_average_sets(data.copy(), name)
+        )
+        from_card = _comparable(*module.statistics_from_card(*card, data.copy(), name))
+        if computed[0] != from_card[0] or computed[2] != from_card[2]:
+            mismatches.append((name, computed[0], from_card[0]))
+            continue
+        for key, frame in computed[1].items():
+            if not frame.astype(object).equals(from_card[1][key].astype(object)):
+                mismatches.append((name, key, frame, from_card[1][key]))
+    assert mismatches == []
+
+
+def test_career_totals_add_up(data_dir):
+    data = load_career_data("atp", "Djokovic N.", (2019, 2020))
+    breakdown = season_breakdown(data, "Djokovic N.")
+    assert list(breakdown["Saison"]) == [2019, 2020]
+    assert int(breakdown["Victoires"].sum() + breakdown["Défaites"].sum()) == len(data)
+    assert len(data[data["Saison"] == 2019]) == 66
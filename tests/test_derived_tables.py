@@ -0,0 +1,10 @@
+import os
+import sqlite3
+
+
+def test_player_matches_name_lookup_uses_an_index(data_dir):
+    conn = sqlite3.connect(os.path.join(data_dir, "atp_2019.db"))
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM player_matches WHERE Player IN (?, ?) ORDER BY Date", ("a", "b")
+    ).fetchall()
+    assert any("idx_player_matches_name" in row[-1] for row in plan)
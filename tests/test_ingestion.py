@@ -0,0 +1,76 @@
+import os
+import shutil
+import sqlite3
+from datetime import timedelta
+
+from openpyxl import load_workbook
+
+from conftest import SOURCE_DIR, use_data_dir
+from xlsx_to_db import ingest_incremental
+
+# Tables de la base saison et des bases partagées mises à jour par l'ingestion
+TABLES = {
+    "atp_2025.db": ["data", "player_matches", "player_season_stats", "player_cards", "player_card_surfaces"],
+    "players.db": ["players", "player_seasons"],
+    "h2h.db": ["h2h_matches", "h2h_summary"],
+    "rankings.db": ["ranking_history"],
+    "elo.db": ["elo_matches", "elo_ratings", "elo_seasons"],
+}
+
+
+def _snapshot(data_dir):
+    snapshot = {}
+    for name, tables in TABLES.items():
+        with sqlite3.connect(os.path.join(data_dir, name)) as conn:
+            for table in tables:
+                snapshot[table] = sorted(conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr)
+    return snapshot
+
+
+def test_incremental_ingest_twice_is_idempotent(tmp_path, monkeypatch):
+    use_data_dir(monkeypatch, str(tmp_path))
+    excel_file = shutil.copy(os.path.join(SOURCE_DIR, "atp_2025.xlsx"), tmp_path)
+    db_file = str(tmp_path / "atp_2025.db")
+
+    ingest_incremental(excel_file, db_file)  # première ingestion : conversion complète
+    first = _snapshot(tmp_path)
+    assert first["data"]
+
+    # Classeur inchangé : rien à faire
+    assert ingest_incremental(excel_file, db_file) == {"inserted": 0, "updated": 0, "deleted": 0}
+    # Empreinte oubliée : chaque ligne est relue, aucune n'a changé
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("DELETE FROM ingestion_log")
+    assert ingest_incremental(excel_file, db_file) == {"inserted": 0, "updated": 0, "deleted": 0}
+    assert _snapshot(tmp_path) == first
+
+
+def test_incremental_ingest_replaces_corrected_key(tmp_path, monkeypatch):
+    use_data_dir(monkeypatch, str(tmp_path))
+    excel_file = shutil.copy(os.path.join(SOURCE_DIR, "atp_2025.xlsx"), tmp_path)
+    db_file = str(tmp_path / "atp_2025.db")
+    ingest_incremental(excel_file, db_file)
+    with sqlite3.connect(db_file) as conn:
+        count = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+
+    # Correction d'une date dans le classeur : la clé naturelle du match change
+    workbook = load_workbook(excel_file)
+    sheet = workbook.worksheets[0]
+    header = [cell.value for cell in sheet[1]]
+    date_cell = sheet.cell(row=2, column=header.index("Date") + 1)
+    old_key = (
+        date_cell.value.strftime("%Y-%m-%d %H:%M:%S"),
+        sheet.cell(row=2, column=header.index("Winner") + 1).value,
+        sheet.cell(row=2, column=header.index("Loser") + 1).value,
+    )
+    date_cell.value += timedelta(days=1)
+    workbook.save(excel_file)
+
+    assert ingest_incremental(excel_file, db_file) == {"inserted": 1, "updated": 0, "deleted": 1}
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM data").fetchone()[0] == count
+        assert not conn.execute("SELECT 1 FROM data WHERE Date = ? AND Winner = ? AND Loser = ?", old_key).fetchall()
+        assert conn.execute("SELECT COUNT(*) FROM player_matches").fetchone()[0] == 2 * count
+        assert not conn.execute(
+            "SELECT 1 FROM player_matches WHERE match_id NOT IN (SELECT rowid FROM data)"
+        ).fetchall()
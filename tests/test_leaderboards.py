@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+import leaderboards
+
+
+@pytest.mark.parametrize("seasons", [2019, [2019, 2020]])
+def test_min_score_is_applied_in_sql_and_fallback(data_dir, monkeypatch, seasons):
+    top = leaderboards.leaderboard("atp", seasons, "Titles", k=50, min_score=2)
+    assert not top.empty
+    assert top["Titles"].min() >= 2
+    assert len(top) < len(leaderboards.leaderboard("atp", seasons, "Titles", k=50))
+
+    # Même classement par le calcul pandas (base considérée comme non migrée)
+    table_columns = leaderboards.table_columns
+    monkeypatch.setattr(
+        leaderboards, "table_columns",
+        lambda path, table: [] if table == "player_season_stats" else table_columns(path, table),
+    )
+    leaderboards.leaderboard.clear()
+    fallback = leaderboards.leaderboard("atp", seasons, "Titles", k=50, min_score=2)
+    pd.testing.assert_frame_equal(top, fallback)
+
+
+def test_min_score_must_be_positive(data_dir):
+    with pytest.raises(ValueError):
+        leaderboards.leaderboard("atp", 2019, "Wins", min_score=0)
@@ -0,0 +1,15 @@
+import pandas as pd
+
+import rankings
+
+
+def test_top_at_date_ranks_are_unique(data_dir, monkeypatch):
+    top = rankings.top_at_date("atp", "2019-06-30", 10)
+    assert list(top["Rank"]) == list(range(1, 11))
+    assert top["Player"].is_unique
+    assert top["Points"].is_monotonic_decreasing
+
+    # Même résultat sans rankings.db (calcul depuis les matchs)
+    monkeypatch.setattr(rankings, "rankings_db_path", lambda data_dir=None: "/nonexistent/rankings.db")
+    fallback = rankings.top_at_date("atp", "2019-06-30", 10)
+    pd.testing.assert_frame_equal(top, fallback, check_dtype=False)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rolling_form import rolling_form
+
+
+def _matches(seed=0, n=2000):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Player": rng.choice(["A", "B", "C", "D"], n),
+        "Surface": rng.choice(["Clay", "Hard"], n),
+        # Plusieurs matchs le même jour, dans le désordre
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "Result": rng.choice(["Victoire", "Défaite"], n),
+    })
+
+
+def _reference(matches, keys, window, days):
+    # pandas rolling sur chaque groupe trié par date (tri stable)
+    frame = matches.sort_values(keys + ["Date"], kind="stable").reset_index(drop=True)
+    wins = (frame["Result"] == "Victoire").astype(float)
+    grouped = wins.groupby([frame[k] for k in keys])
+    form = grouped.transform(lambda s: s.rolling(window, min_periods=1).mean())
+    form_days = grouped.transform(
+        lambda s: s.set_axis(frame.loc[s.index, "Date"]).rolling(f"{days}D").mean().to_numpy()
+    )
+    return frame.assign(Form=form, FormDays=form_days)
+
+
+@pytest.mark.parametrize("by_surface", [False, True])
+@pytest.mark.parametrize("window, days", [(1, 1), (10, 90), (50, 30)])
+def test_rolling_form_matches_pandas_rolling(by_surface, window, days):
+    matches = _matches()
+    keys = ["Player", "Surface"] if by_surface else ["Player"]
+    # Groupes dans l'ordre d'apparition : on les remet dans l'ordre alphabétique
+    result = rolling_form(matches, window=window, days=days, by_surface=by_surface)
+    result = result.sort_values(keys, kind="stable")
+    expected = _reference(matches, keys, window, days)
+    columns = keys + ["Date", "Result", "Form", "FormDays"]
+    pd.testing.assert_frame_equal(result[columns].reset_index(drop=True), expected[columns])
@@ -0,0 +1,14 @@
+import numpy as np
+
+from tournament_sim import draw_from_list, simulate
+
+
+def test_simulation_is_reproducible_for_a_seed():
+    tree, players, labels = draw_from_list(["A", "B", "C", "Bye"])
+    probs = np.array([[0.5, 0.7, 0.6], [0.3, 0.5, 0.4], [0.4, 0.6, 0.5]])
+    reach, titles = simulate(tree, probs, len(labels), 20_000, seed=1)
+    again = simulate(tree, probs, len(labels), 20_000, seed=1)
+    assert np.array_equal(reach, again[0]) and np.array_equal(titles, again[1])
+    assert titles.sum() == 1.0
+    # C est exempté du premier tour et joue forcément la finale
+    assert reach[players.index("C"), 1] == 1.0
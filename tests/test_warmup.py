@@ -0,0 +1,32 @@
+import cache
+import atp_fav_surf
+import atp_three_sets
+import atp_tiebreaks
+import wta_fav_surf
+import wta_three_sets
+import wta_tiebreaks
+import warmup
+
+LOADERS = ["leaderboards.leaderboard", "elo.season_ratings", "derived_tables.load_player_card"]
+
+
+def _misses():
+    stats = cache.cache_stats().set_index("Function")
+    return {name: stats.loc[name, "Misses"] for name in LOADERS}
+
+
+def test_pages_are_served_from_the_warmed_cache(data_dir):
+    for label, step in warmup.warmup_steps():
+        step()
+    before = _misses()
+    assert all(before.values())
+
+    for season in warmup.warm_seasons("atp"):
+        atp_fav_surf.get_atp_favorites_by_surface(season)
+        atp_three_sets.get_atp_three_set_players_non_slam(season)
+        atp_tiebreaks.get_top_tiebreak_players(season)
+    for season in warmup.warm_seasons("wta"):
+        wta_fav_surf.get_wta_favorites_by_surface(season)
+        wta_three_sets.get_top_wta_three_set_players(season)
+        wta_tiebreaks.get_top_tiebreak_players(season, "wta")
+    assert _misses() == before
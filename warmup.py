@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from typing import Callable, List, Tuple
+
+import atp_dashboard
+import wta_dashboard
+from advanced_dashboard import get_player_list, load_elo_ratings
+from db_pool import has_table
+from derived_tables import load_player_card
+from elo import season_ratings
+from leaderboards import leaderboard
+from match_store import discover_sources
+from player_search import player_index
+
+# Préchauffage au démarrage : un thread d'arrière-plan appelle directement les
+# chargeurs mis en cache (jamais les pages : pas d'appel Streamlit hors session),
+# avec les mêmes arguments que les pages, pour les deux dernières saisons de
+# chaque circuit et la saison proposée par défaut (classements des pages favoris /
+# 3 sets / tie-breaks, Elo, index et liste des joueurs, matchs et fiches des
+# TOP_PLAYERS joueurs ayant le plus joué). Les connexions SQLite et le cache de
+# pages de l'OS sont chauds du même coup. TENNIS_WARMUP=0 le désactive.
+DEFAULT_SEASON = 2024  # saison proposée par défaut dans main.py
+TOP_PLAYERS = 20
+
+# Classements des pages (libellé, métrique, filtres), appelés comme par les pages
+PAGE_LEADERBOARDS = {
+    "atp": [
+        ("favoris surface", "Wins", {"k": 10, "partition": "Surface"}),
+        ("matchs en 3 sets", "ThreeSetMatches", {"k": 15, "exclude_series": "Grand Slam"}),
+        ("tie-breaks", "TiebreakMatches", {"k": 15, "exclude_series": "Grand Slam"}),
+    ],
+    "wta": [
+        ("favoris surface", "Wins", {"k": 10, "partition": "Surface"}),
+        ("matchs en 3 sets", "ThreeSetMatches", {"k": 15}),
+        ("tie-breaks", "TiebreakMatches", {"k": 15}),
+    ],
+}
+
+_status = {"state": "pending", "done": 0, "total": 0, "elapsed": 0.0, "steps": []}
+_status_lock = threading.Lock()
+_started = False
+
+
+def warm_seasons(circuit: str) -> List[int]:
+    """Saison en cours, précédente et saison par défaut disponibles pour le circuit"""
+    available = sorted(season for (c, season), path in discover_sources().items() if c == circuit and path.endswith(".db"))
+    return sorted(set(available[-2:]) | ({DEFAULT_SEASON} & set(available)))
+
+
+def warm_top_players(circuit: str, season: int) -> int:
+    """Charge, comme le tableau de bord, les matchs et la fiche des joueurs ayant le
+    plus de matchs ; retourne le nombre de joueurs"""
+    module = atp_dashboard if circuit == "atp" else wta_dashboard
+    file_path = module.season_file(season)
+    players = leaderboard(circuit, season, "Matches", k=TOP_PLAYERS)["Player"].tolist()
+    for player in players:
+        module.load_data(file_path, player, "", "")
+        module.load_three_set_matches(file_path, player)
+        load_player_card(circuit, season, player)
+    return len(players)
+
+
+def warmup_steps() -> List[Tuple[str, Callable]]:
+    """Étapes du préchauffage (libellé, fonction), des plus demandées aux moins demandées"""
+    steps = []
+    for circuit in ("atp", "wta"):
+        steps.append((f"{circuit.upper()} - index joueurs", lambda c=circuit: player_index(c)))
+        steps.append((f"{circuit.upper()} - Elo", lambda c=circuit: load_elo_ratings(c.upper())))
+        for season in reversed(warm_seasons(circuit)):
+            file_path = (atp_dashboard if circuit == "atp" else wta_dashboard).season_file(season)
+            label = f"{circuit.upper()} {season}"
+            for name, metric, filters in PAGE_LEADERBOARDS[circuit]:
+                steps.append((
+                    f"{label} - {name}",
+                    lambda c=circuit, s=season, m=metric, f=filters: leaderboard(c, s, m, **f),
+                ))
+            steps.append((f"{label} - Elo de surface", lambda c=circuit, s=season: season_ratings(c, s)))
+            steps.append((f"{label} - base", lambda p=file_path: has_table(p, "data")))
+            steps.append((f"{label} - joueurs", lambda p=file_path, c=circuit, s=season: get_player_list(p, c, s)))
+            steps.append((f"{label} - fiches joueurs", lambda c=circuit, s=season: warm_top_players(c, s)))
+    return steps
+
+
+def run_warmup() -> dict:
+    """Exécute le préchauffage (les étapes en échec sont ignorées) et retourne le statut final"""
+    start = time.perf_counter()
+    pending = warmup_steps()
+    with _status_lock:
+        _status.update(state="running", done=0, total=len(pending), steps=[])
+    for label, step in pending:
+        step_start = time.perf_counter()
+        try:
+            step()
+            error = None
+        except Exception as e:
+            error = str(e)
+        with _status_lock:
+            _status["done"] += 1
+            _status["steps"].append((label, time.perf_counter() - step_start, error))
+            _status["elapsed"] = time.perf_counter() - start
+    with _status_lock:
+        _status["state"] = "done"
+    return warmup_status()
+
+
+def start_warmup() -> bool:
+    """Lance le préchauffage dans un thread, une seule fois par processus"""
+    global _started
+    if os.environ.get("TENNIS_WARMUP", "1") == "0":
+        return False
+    with _status_lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=run_warmup, name="cache-warmup", daemon=True).start()
+    return True
+
+
+def warmup_status() -> dict:
+    """État du préchauffage : state (pending, running, done), done / total étapes,
+    durée écoulée et (libellé, durée, erreur) de chaque étape terminée"""
+    with _status_lock:
+        return {**_status, "steps": list(_status["steps"])}
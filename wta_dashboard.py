@@ -3,43 +3,36 @@ import os
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-
-@st.cache_data
+from cache import cached
+from db_pool import fetchall, has_table, read_sql
+from derived_tables import load_player_card
+from match_store import compact_frame
+import player_dashboard
+from player_dashboard import load_career_data, load_seasons, read_player_matches, season_breakdown, statistics_from_card
+from player_search import search_players
+from players import player_clause, season_from_db_file, season_players
+
+def season_file(season):
+    return player_dashboard.season_file("wta", season)
+
+@cached(files=lambda file_path, *args, **kwargs: [file_path])
 def load_data(file_path, player_name, surface_condition="", series_condition=""):
-    try:
-        connexion = sqlite3.connect(file_path)
-        query = f"""
-        SELECT Series, Tournament, Surface, Round, Winner, Loser, W1, L1, W2, L2, W3, L3, Wsets, Lsets
-        FROM data
-        WHERE (Winner = ? OR Loser = ?) {surface_condition} {series_condition};
-        """
-        data = pd.read_sql_query(query, connexion, params=(player_name, player_name))
-        connexion.close()
-        return data
-    except (sqlite3.OperationalError, pd.errors.DatabaseError):
-        return pd.DataFrame()  # Retourne un DataFrame vide en cas d'erreur
+    return compact_frame(read_player_matches(file_path, "wta", player_name, surface_condition, series_condition))
 
+@cached(files=lambda file_path, table_name: [file_path])
 def _db_has_table(file_path: str, table_name: str) -> bool:
-    try:
-        connexion = sqlite3.connect(file_path)
-        cur = connexion.cursor()
-        cur.execute(
-            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=? LIMIT 1",
-            (table_name,),
-        )
-        ok = cur.fetchone() is not None
-        connexion.close()
-        return ok
-    except Exception:
-        return False
+    return has_table(file_path, table_name)
 
-@st.cache_data
+@cached(files=lambda file_path: [file_path])
 def _db_players_overview(file_path: str) -> tuple[int, list[str]]:
     try:
-        connexion = sqlite3.connect(file_path)
-        cur = connexion.cursor()
-        total = int(cur.execute("SELECT COUNT(*) FROM data").fetchone()[0])
-        rows = cur.execute(
+        total = int(fetchall(file_path, "SELECT COUNT(*) FROM data")[0][0])
+        season = season_from_db_file(file_path)
+        players = season_players(*season) if season is not None else []
+        if players:
+            return total, players[:80]
+        rows = fetchall(
+            file_path,
             """
             SELECT name FROM (
               SELECT Winner AS name FROM data
@@ -49,46 +42,46 @@ def _db_players_overview(file_path: str) -> tuple[int, list[str]]:
             WHERE name IS NOT NULL AND TRIM(name) <> ''
             ORDER BY name
             LIMIT 80;
-            """
-        ).fetchall()
-        connexion.close()
+            """,
+        )
         players = [str(r[0]) for r in rows if r and r[0]]
         return total, players
     except Exception:
         return 0, []
 
+@cached(files=lambda file_path, player_name: [file_path])
 def load_three_set_matches(file_path, player_name):
     try:
-        connexion = sqlite3.connect(file_path)
-        query = """
-        SELECT Series, Tournament, Date, Round, Winner, Loser, Surface
+        player_condition, params = player_clause(file_path, "wta", player_name)
+        query = f"""
+        SELECT Series, Tournament, Date, Round, TRIM(Winner) AS Winner, TRIM(Loser) AS Loser, Surface
         FROM data
-        WHERE ((Lsets = 1.0 and Wsets = 2.0) and (Winner = ? or Loser = ?));
+        WHERE ((Lsets = 1.0 and Wsets = 2.0) and {player_condition});
         """
-        data = pd.read_sql_query(query, connexion, params=(player_name, player_name))
-        connexion.close()
-        return data
+        return read_sql(file_path, query, params=params)
     except (sqlite3.OperationalError, pd.errors.DatabaseError):
         return pd.DataFrame()  # Retourne un DataFrame vide en cas d'erreur
 
 def calculate_statistics(data, player_name):
+    # Masques calculés une seule fois pour toutes les métriques
+    won = data["Winner"] == player_name
+    lost = data["Loser"] == player_name
+    titles = data[won & (data["Round"] == "The Final")]
+
     stats = {
         "Nombre de matchs": len(data),
-        "Nombre de victoires": len(data[data["Winner"] == player_name]),
-        "Nombre de défaites": len(data[data["Loser"] == player_name]),
-        "Titres remportés": len(data[(data["Winner"] == player_name) & (data["Round"] == "The Final")]),
-        "Titres en Grand Slam": len(data[(data["Winner"] == player_name) & (data["Round"] == "The Final") & (data["Series"] == "Grand Slam")]),
+        "Nombre de victoires": int(won.sum()),
+        "Nombre de défaites": int(lost.sum()),
+        "Titres remportés": len(titles),
+        "Titres en Grand Slam": int((titles["Series"] == "Grand Slam").sum()),
     }
 
-    surface_titles = data[(data["Winner"] == player_name) & (data["Round"] == "The Final")].groupby("Surface").size().reset_index(name="Titres")
-    stats["Titres par surface"] = surface_titles
-
-    tournaments_won = data[(data["Winner"] == player_name) & (data["Round"] == "The Final")][["Tournament", "Series"]]
-    stats["Tournois remportés"] = tournaments_won
+    stats["Titres par surface"] = titles.groupby("Surface", observed=True).size().reset_index(name="Titres")
+    stats["Tournois remportés"] = titles[["Tournament", "Series"]]
 
     # Calcul du nombre de matchs en 3 sets par surface
     three_set_matches = data[(data["Wsets"] + data["Lsets"] == 3)]
-    stats["Matchs en 3 sets par surface"] = three_set_matches.groupby("Surface").size().reset_index(name="Matchs en 3 sets")
+    stats["Matchs en 3 sets par surface"] = three_set_matches.groupby("Surface", observed=True).size().reset_index(name="Matchs en 3 sets")
 
     return stats
 
@@ -118,19 +111,28 @@ def calculate_average_sets(data, player_name):
     return avg_sets_grand_slam, avg_sets_non_grand_slam
 
 def wta_dashboard(player_name, season, surface_condition="", series_condition=""):
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(base_dir, "Data_Base_Tennis", f"wta_{season}.db")
+    # season : une année, ou un tuple (début, fin) pour le mode carrière
+    career = isinstance(season, tuple)
+    if career:
+        # Les saisons absentes de la plage sont simplement ignorées
+        file_path = season_file(season[1])
+        data = load_career_data("wta", player_name, season, surface_condition, series_condition)
+        three_set_matches = load_seasons(load_three_set_matches, "wta", season, player_name)
+        season_label = f"{season[0]}-{season[1]}"
+    else:
+        file_path = season_file(season)
 
-    if not os.path.exists(file_path):
-        st.error(f"Base introuvable: {file_path}")
-        return
+        if not os.path.exists(file_path):
+            st.error(f"Base introuvable: {file_path}")
+            return
 
-    if not _db_has_table(file_path, "data"):
-        st.error(f"Base invalide: table 'data' introuvable dans {os.path.basename(file_path)}")
-        return
+        if not _db_has_table(file_path, "data"):
+            st.error(f"Base invalide: table 'data' introuvable dans {os.path.basename(file_path)}")
+            return
 
-    data = load_data(file_path, player_name, surface_condition, series_condition)
-    three_set_matches = load_three_set_matches(file_path, player_name)
+        data = load_data(file_path, player_name, surface_condition, series_condition)
+        three_set_matches = load_three_set_matches(file_path, player_name)
+        season_label = season
 
     if data.empty:
         st.warning("Aucune donnée trouvée pour ce joueur avec les filtres sélectionnés.")
@@ -138,15 +140,26 @@ def wta_dashboard(player_name, season, surface_condition="", series_condition=""
             st.write(f"Base utilisée : {file_path}")
             total, players = _db_players_overview(file_path)
             st.write(f"Matchs dans la base : {total}")
-            if players:
-                st.write("Exemples de noms disponibles (saisie exacte requise) :")
+            close = [] if career else [name for name, _ in search_players(player_name, "wta", 10, season)]
+            if close:
+                st.write("Noms proches dans cette saison :")
+                st.code("\n".join(close))
+            elif players:
+                st.write("Exemples de noms disponibles :")
                 st.code("\n".join(players))
         return
 
-    stats = calculate_statistics(data, player_name)
-    avg_sets_grand_slam, avg_sets_non_grand_slam = calculate_average_sets(data, player_name)
+    # Fiche pré-calculée (lecture ponctuelle) pour une saison sans filtre, sinon calcul
+    card = None
+    if not career and not surface_condition and not series_condition:
+        card = load_player_card("wta", season, player_name)
+    if card is not None:
+        stats, avg_sets_grand_slam, avg_sets_non_grand_slam = statistics_from_card(*card, data, player_name)
+    else:
+        stats = calculate_statistics(data, player_name)
+        avg_sets_grand_slam, avg_sets_non_grand_slam = calculate_average_sets(data, player_name)
 
-    st.header(f"Statistiques générales - {season} - {player_name}")
+    st.header(f"Statistiques générales - {season_label} - {player_name}")
     col1, col2 = st.columns(2)
     col1.metric("Nombre de matchs", stats["Nombre de matchs"])
     col1.metric("Nombre de victoires", stats["Nombre de victoires"])
@@ -157,6 +170,20 @@ def wta_dashboard(player_name, season, surface_condition="", series_condition=""
     st.metric("Moyenne de sets/match (hors Grand Slam)", f"{avg_sets_non_grand_slam:.2f}")
     st.metric("Moyenne de sets/match (Grand Slam)", f"{avg_sets_grand_slam:.2f}")
 
+    if career:
+        st.header("Bilan par saison")
+        season_stats = season_breakdown(data, player_name)
+        st.dataframe(season_stats)
+        fig = px.bar(
+            season_stats,
+            x="Saison",
+            y=["Victoires", "Défaites"],
+            title="Victoires et défaites par saison",
+            barmode="group",
+            text_auto=True,
+        )
+        st.plotly_chart(fig)
+
     st.header("Titres remportés par surface")
     if not stats["Titres par surface"].empty:
         st.dataframe(stats["Titres par surface"])
@@ -166,10 +193,12 @@ def wta_dashboard(player_name, season, surface_condition="", series_condition=""
         st.write("Aucun titre remporté pour les surfaces sélectionnées.")
 
     st.header("Performances par surface")
-    surface_stats = data.groupby("Surface").agg(
-        Victoires=("Winner", lambda x: (x == player_name).sum()),
-        Défaites=("Loser", lambda x: (x == player_name).sum()),
-    ).reset_index()
+    surface_stats = (
+        data.assign(Victoires=data["Winner"] == player_name, Défaites=data["Loser"] == player_name)
+        .groupby("Surface", observed=True)[["Victoires", "Défaites"]]
+        .sum()
+        .reset_index()
+    )
     surface_stats["Total"] = surface_stats["Victoires"] + surface_stats["Défaites"]
 
     fig = px.bar(
@@ -204,5 +233,6 @@ def wta_dashboard(player_name, season, surface_condition="", series_condition=""
 
     tournament_stats = data[data["Winner"] == player_name]["Tournament"].value_counts().reset_index()
     tournament_stats.columns = ["Tournoi", "Victoires"]
+    tournament_stats = tournament_stats[tournament_stats["Victoires"] > 0]
     fig2 = px.pie(tournament_stats, names="Tournoi", values="Victoires", title="Répartition des victoires par tournoi")
     st.plotly_chart(fig2)
\ No newline at end of file
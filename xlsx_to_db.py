@@ -1,23 +1,467 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
 import pandas as pd
 import sqlite3
+from openpyxl import load_workbook
+from derived_tables import build_player_cards, build_player_matches, build_season_stats, refresh_player_matches
+from elo import replay_elo, update_elo
+from head_to_head import update_head_to_head
+from match_store import build_partition
+from players import assign_player_ids, season_from_db_file
+from rankings import update_rankings
+from set_scores import store_match_features
+
+# Index secondaires de la table data : recherches par joueur (Winner = ? OR Loser = ?),
+# filtres Surface/Series/Date et GROUP BY Surface, Winner des pages "Favoris surface".
+# (WinnerID, Surface) et (LoserID, Surface) servent les mêmes recherches sur identifiants.
+# (Winner, Surface) et (Loser, Surface) couvrent les recherches joueur + surface et
+# servent aussi les recherches par joueur seul (préfixe gauche).
+DATA_INDEXES = {
+    "idx_data_winner_surface": ("Winner", "Surface"),
+    "idx_data_loser_surface": ("Loser", "Surface"),
+    "idx_data_surface_winner": ("Surface", "Winner"),
+    "idx_data_winner_id": ("WinnerID", "Surface"),
+    "idx_data_loser_id": ("LoserID", "Surface"),
+    "idx_data_series": ("Series",),
+    "idx_data_date": ("Date",),
+}
+
+def natural_key(columns):
+    """Clé naturelle d'un match : (n° de tournoi, Date, Round, Winner, Loser)"""
+    tournament_col = next((c for c in ("ATP", "WTA") if c in columns), None)
+    if tournament_col is None:
+        return None
+    return (tournament_col, "Date", "Round", "Winner", "Loser")
+
+def create_indexes(conn):
+    """Crée les index secondaires de la table data (idempotent)"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(data)")}
+    if not columns:
+        return []
+    created = []
+    # Index unique sur la clé naturelle, cible des upserts de l'ingestion incrémentale
+    key = natural_key(columns)
+    if key is not None:
+        cols = ", ".join(f'"{c}"' for c in key)
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_data_natural_key ON data ({cols})')
+        created.append("idx_data_natural_key")
+    for name, index_columns in DATA_INDEXES.items():
+        # Certaines saisons n'ont pas toutes les colonnes (ex : 'Tier' au lieu de 'Series')
+        if not set(index_columns) <= columns:
+            continue
+        cols = ", ".join(f'"{c}"' for c in index_columns)
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON data ({cols})')
+        created.append(name)
+    # Statistiques pour que le planificateur choisisse les index
+    conn.execute("ANALYZE")
+    conn.commit()
+    return created
+
+# Ingestion en flux : le classeur est lu par blocs de CHUNK_ROWS lignes
+# (openpyxl en lecture seule), la mémoire reste bornée quelle que soit sa taille.
+CHUNK_ROWS = 5000
+
+TEXT_COLUMNS = {"Location", "Tournament", "Series", "Tier", "Court", "Surface", "Round", "Winner", "Loser", "Comment"}
+INTEGER_COLUMNS = {"ATP", "WTA", "Best of"}
+
+def _column_type(name):
+    if name == "Date":
+        return "TIMESTAMP"
+    if name in TEXT_COLUMNS:
+        return "TEXT"
+    if name in INTEGER_COLUMNS:
+        return "INTEGER"
+    return "REAL"
+
+def file_fingerprint(path):
+    """Empreinte SHA-256 du classeur source"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _coerce_chunk(df):
+    """Types homogènes d'un bloc à l'autre : texte, dates, numériques en float64"""
+    for col in df.columns:
+        kind = _column_type(col)
+        if kind == "TIMESTAMP":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif kind != "TEXT":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+def iter_excel_chunks(excel_file, chunk_rows=CHUNK_ROWS):
+    """Lit la première feuille du classeur par blocs de lignes typés"""
+    workbook = load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(h).strip() for h in header if h is not None]
+        width = len(columns)
+        batch = []
+        for row in rows:
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            if all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield _coerce_chunk(pd.DataFrame(batch, columns=columns))
+                batch = []
+        if batch:
+            yield _coerce_chunk(pd.DataFrame(batch, columns=columns))
+    finally:
+        workbook.close()
+
+def _storage_frame(df):
+    """Valeurs telles que stockées en base (dates en texte, NaN -> NULL)"""
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return out.astype(object).where(out.notna(), None)
+
+def _row_keys_and_hashes(records, key):
+    keys = records[list(key)].astype(str).agg("|".join, axis=1)
+    hashes = pd.util.hash_pandas_object(records.astype(str), index=False).map("{:016x}".format)
+    return keys, hashes
+
+def _create_ingestion_tables(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS ingestion_log (source TEXT PRIMARY KEY, fingerprint TEXT, rows INTEGER, ingested_at TEXT)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS data_row_hashes (row_key TEXT PRIMARY KEY, row_hash TEXT)")
+
+def _record_row_hashes(conn, keys, hashes):
+    conn.executemany(
+        "INSERT INTO data_row_hashes VALUES (?, ?) ON CONFLICT(row_key) DO UPDATE SET row_hash = excluded.row_hash",
+        zip(keys, hashes),
+    )
+
+def _record_fingerprint(conn, excel_file, fingerprint):
+    conn.execute(
+        "INSERT OR REPLACE INTO ingestion_log VALUES (?, ?, ?, ?)",
+        (os.path.basename(excel_file), fingerprint, int(conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]),
+         datetime.now().isoformat(timespec="seconds")),
+    )
+
+def _stored_fingerprint(conn, excel_file):
+    try:
+        row = conn.execute(
+            "SELECT fingerprint FROM ingestion_log WHERE source = ?", (os.path.basename(excel_file),)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def _bulk_pragmas(conn, enabled):
+    """PRAGMA d'ingestion : sans journal ni fsync pendant le chargement"""
+    if enabled:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+    else:
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("PRAGMA synchronous = FULL")
 
 # Fonction pour convertir un fichier .xlsx en .db
-def excel_to_db(excel_file, db_file):
-    # Lire le fichier Excel
-    df = pd.read_excel(excel_file)
+def excel_to_db(excel_file, db_file, incremental=False, chunk_rows=CHUNK_ROWS, replay_ratings=True):
+    """Convertit un classeur en base saison (table data remplacée, lecture en flux).
 
-    # Créer une connexion à la base de données SQLite
+    Le chargement se fait dans une seule transaction, sans journal : une
+    interruption laisse une base à reconstruire, ce qui est le cas d'usage.
+    replay_ratings=False laisse le rejeu Elo à l'appelant (reconstruction parallèle).
+    """
+    if incremental:
+        return ingest_incremental(excel_file, db_file, chunk_rows)
+
+    start = time.perf_counter()
+    fingerprint = file_fingerprint(excel_file)
     conn = sqlite3.connect(db_file)
+    _bulk_pragmas(conn, True)
+    rows = 0
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS data")
+            conn.execute("DROP TABLE IF EXISTS data_row_hashes")
+            _create_ingestion_tables(conn)
+            key = None
+            for chunk in iter_excel_chunks(excel_file, chunk_rows):
+                cols = list(chunk.columns)
+                if rows == 0:
+                    definition = ", ".join(f'"{c}" {_column_type(c)}' for c in cols)
+                    conn.execute(f"CREATE TABLE data ({definition})")
+                    quoted = ", ".join(f'"{c}"' for c in cols)
+                    insert = f"INSERT INTO data ({quoted}) VALUES ({', '.join(['?'] * len(cols))})"
+                    key = natural_key(cols)
+                records = _storage_frame(chunk)
+                conn.executemany(insert, records.itertuples(index=False, name=None))
+                if key is not None:
+                    _record_row_hashes(conn, *_row_keys_and_hashes(records, key))
+                rows += len(records)
+            if rows:
+                assign_player_ids(conn, db_file)
+                store_match_features(conn)
+                _record_fingerprint(conn, excel_file, fingerprint)
+
+        if rows:
+            # Index et tables dérivées construits une fois les données chargées
+            create_indexes(conn)
+            build_player_matches(conn)
+            build_season_stats(conn)
+            build_player_cards(conn)
+            conn.commit()
+            update_head_to_head(conn, db_file)
+            update_rankings(conn, db_file)
+            if replay_ratings:
+                update_elo(db_file)
+    finally:
+        _bulk_pragmas(conn, False)
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f'Le fichier {excel_file} a été converti en {db_file} : {rows} lignes en {elapsed:.2f} s ({rows / elapsed:.0f} lignes/s).')
+    return rows
 
-    # Écrire le DataFrame dans la base de données
-    df.to_sql('data', conn, if_exists='replace', index=False)
+def _delete_stale_rows(conn, key, seen_keys, tournaments):
+    """Supprime les matchs des tournois du classeur dont la clé naturelle n'y figure plus ;
+    renvoie leurs rowid"""
+    if not tournaments:
+        return []
+    tournaments = sorted(tournaments)
+    placeholders = ", ".join(["?"] * len(tournaments))
+    selected = ", ".join(f'"{c}"' for c in key)
+    stored = pd.read_sql_query(
+        f'SELECT rowid AS match_id, {selected} FROM data WHERE "{key[0]}" IN ({placeholders})',
+        conn, params=tournaments,
+    )
+    if stored.empty:
+        return []
+    # Mêmes types que les lignes lues dans le classeur (n° de tournoi stocké en entier)
+    keys, _ = _row_keys_and_hashes(_storage_frame(_coerce_chunk(stored[list(key)].copy())), key)
+    stale = ~keys.isin(seen_keys).to_numpy()
+    if not stale.any():
+        return []
+    match_ids = stored.loc[stale, "match_id"].tolist()
+    conn.executemany("DELETE FROM data WHERE rowid = ?", ((i,) for i in match_ids))
+    conn.executemany("DELETE FROM data_row_hashes WHERE row_key = ?", ((k,) for k in keys[stale]))
+    return match_ids
 
-    # Fermer la connexion
-    conn.close()
-    print(f'Le fichier {excel_file} a été converti en {db_file}.')
+def ingest_incremental(excel_file, db_file, chunk_rows=CHUNK_ROWS):
+    """Met à jour une base saison à partir de son classeur sans la réécrire.
+
+    Les lignes nouvelles ou modifiées (repérées par leur clé naturelle et une
+    empreinte de ligne) sont insérées ou mises à jour dans une seule transaction ;
+    les lignes des tournois du classeur dont la clé n'y figure plus (clé corrigée
+    ou match retiré) sont supprimées. Les index et les tables dérivées sont
+    conservés et mis à jour.
+    """
+    start = time.perf_counter()
+    fingerprint = file_fingerprint(excel_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(data)")]
+        if not columns:
+            # Première ingestion : conversion complète
+            conn.close()
+            excel_to_db(excel_file, db_file, chunk_rows=chunk_rows)
+            return {"inserted": None, "updated": None, "deleted": None}
+
+        if _stored_fingerprint(conn, excel_file) == fingerprint:
+            print(f'{excel_file} inchangé, rien à faire.')
+            return {"inserted": 0, "updated": 0, "deleted": 0}
+
+        create_indexes(conn)
+        try:
+            known = dict(conn.execute("SELECT row_key, row_hash FROM data_row_hashes"))
+        except sqlite3.OperationalError:
+            known = {}
+
+        rows = 0
+        match_ids = []
+        key, seen_keys, tournaments = None, set(), set()
+        with conn:
+            _create_ingestion_tables(conn)
+            last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM data").fetchone()[0]
+            for chunk in iter_excel_chunks(excel_file, chunk_rows):
+                cols = list(chunk.columns)
+                key = natural_key(cols)
+                if key is None:
+                    raise ValueError(f"{excel_file} : colonne ATP/WTA absente, clé naturelle introuvable")
+
+                # Nouvelles colonnes apparues dans le classeur
+                for col in cols:
+                    if col not in columns:
+                        conn.execute(f'ALTER TABLE data ADD COLUMN "{col}" {_column_type(col)}')
+                        columns.append(col)
+
+                records = _storage_frame(chunk)
+                keys, hashes = _row_keys_and_hashes(records, key)
+                seen_keys.update(keys)
+                tournaments.update(records[key[0]].dropna())
+                todo = (keys.map(known) != hashes).to_numpy()
+                rows += len(records)
+                if not todo.any():
+                    continue
+
+                quoted = ", ".join(f'"{c}"' for c in cols)
+                placeholders = ", ".join(["?"] * len(cols))
+                conflict = ", ".join(f'"{c}"' for c in key)
+                updates = ", ".join(f'"{c}" = excluded."{c}"' for c in cols if c not in key)
+                upsert = (
+                    f"INSERT INTO data ({quoted}) VALUES ({placeholders}) "
+                    f"ON CONFLICT({conflict}) DO UPDATE SET {updates} RETURNING rowid"
+                )
+                for row in records[todo].itertuples(index=False, name=None):
+                    match_ids.append(conn.execute(upsert, row).fetchone()[0])
+                _record_row_hashes(conn, keys[todo], hashes[todo])
+
+            deleted = _delete_stale_rows(conn, key, seen_keys, tournaments)
+            assign_player_ids(conn, db_file)
+            store_match_features(conn, match_ids)
+            # Les matchs supprimés disparaissent aussi de player_matches
+            refresh_player_matches(conn, match_ids + deleted)
+            build_season_stats(conn)
+            build_player_cards(conn)
+            _record_fingerprint(conn, excel_file, fingerprint)
+        # Face-à-face et historique des classements : la saison y est remplacée une fois la base à jour
+        update_head_to_head(conn, db_file)
+        update_rankings(conn, db_file)
+        update_elo(db_file)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    inserted = sum(1 for match_id in match_ids if match_id > last_rowid)
+    result = {"inserted": inserted, "updated": len(match_ids) - inserted, "deleted": len(deleted)}
+    print(
+        f'{excel_file} -> {db_file} : {result["inserted"]} ajout(s), {result["updated"]} mise(s) à jour, '
+        f'{result["deleted"]} suppression(s) '
+        f'sur {rows} lignes en {elapsed:.2f} s ({rows / elapsed:.0f} lignes/s).'
+    )
+    return result
+
+def migrate_databases(db_files):
+    """Ajoute identifiants joueurs, caractéristiques de match, index secondaires et
+    tables dérivées aux bases existantes, et les indexe dans les face-à-face,
+    l'historique des classements et le classement Elo"""
+    # Elo : un seul rejeu par circuit, depuis la plus ancienne saison migrée
+    replays = {}
+    for db_file in db_files:
+        try:
+            conn = sqlite3.connect(db_file)
+            assign_player_ids(conn, db_file)
+            store_match_features(conn)
+            conn.commit()
+            created = create_indexes(conn)
+            if created:
+                build_player_matches(conn)
+                build_season_stats(conn)
+                build_player_cards(conn)
+                conn.commit()
+                update_head_to_head(conn, db_file)
+                update_rankings(conn, db_file)
+                season = season_from_db_file(db_file)
+                if season is not None:
+                    key = (os.path.dirname(os.path.abspath(db_file)), season[0])
+                    replays[key] = min(replays.get(key, season[1]), season[1])
+            conn.close()
+        except sqlite3.Error as e:
+            print(f'{db_file} : échec ({e})')
+            continue
+        if created:
+            print(f'{db_file} : {len(created)} index, tables player_matches, player_season_stats et player_cards, face-à-face')
+        else:
+            print(f'{db_file} : pas de table data, ignoré')
+    for (data_dir, circuit), season in sorted(replays.items()):
+        matches = replay_elo(circuit, season, data_dir)
+        print(f'Elo {circuit.upper()} : {matches} matchs rejoués depuis {season}')
+
+_WORKBOOK_PATTERN = re.compile(r"^(atp|wta)_(\d{4})\.xlsx$")
+
+def discover_workbooks(data_dir):
+    """Classeurs {atp,wta}_{année}.xlsx présents dans data_dir"""
+    workbooks = []
+    for name in sorted(os.listdir(data_dir)):
+        match = _WORKBOOK_PATTERN.match(name)
+        if match:
+            workbooks.append((match.group(1), int(match.group(2)), os.path.join(data_dir, name)))
+    return workbooks
+
+def _rebuild_season(circuit, season, excel_file):
+    """Tâche d'un worker : base saison complète (données, index, tables dérivées, partition Parquet)"""
+    start = time.perf_counter()
+    db_file = os.path.splitext(excel_file)[0] + ".db"
+    rows = excel_to_db(excel_file, db_file, replay_ratings=False)
+    converted = time.perf_counter()
+    build_partition(circuit, season, db_file, os.path.join(os.path.dirname(excel_file), "match_store"))
+    return {
+        "circuit": circuit,
+        "saison": season,
+        "lignes": rows,
+        "conversion (s)": round(converted - start, 2),
+        "parquet (s)": round(time.perf_counter() - converted, 2),
+        "total (s)": round(time.perf_counter() - start, 2),
+    }
+
+def rebuild_all(data_dir='./Data_Base_Tennis', workers=None):
+    """Reconstruit toutes les saisons en parallèle, une saison par processus"""
+    workbooks = discover_workbooks(data_dir)
+    if not workbooks:
+        print(f'Aucun classeur {{atp,wta}}_<année>.xlsx dans {data_dir}.')
+        return pd.DataFrame()
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(_rebuild_season, *workbook): workbook for workbook in workbooks}
+        for future in as_completed(futures):
+            circuit, season, excel_file = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f'{excel_file} : échec ({e})')
+                results.append({"circuit": circuit, "saison": season, "lignes": None})
+
+    # Elo : rejeu séquentiel de chaque circuit une fois toutes les saisons converties
+    for circuit in sorted({workbook[0] for workbook in workbooks}):
+        replay_elo(circuit, min(season for c, season, _ in workbooks if c == circuit), os.path.abspath(data_dir))
+
+    summary = pd.DataFrame(results).sort_values(["circuit", "saison"], ignore_index=True)
+    print(summary.to_string(index=False))
+    print(f'{len(workbooks)} saison(s), {int(summary["lignes"].fillna(0).sum())} lignes en {time.perf_counter() - start:.2f} s.')
+    return summary
 
 # Exemple d'utilisation
 if __name__ == "__main__":
-    excel_file = './Data_Base_Tennis/atp_2025.xlsx'  # Remplacez par le chemin de votre fichier .xlsx
-    db_file = './Data_Base_Tennis/atp_2025.db'        # Remplacez par le nom de votre fichier .db
-    excel_to_db(excel_file, db_file)
+    parser = argparse.ArgumentParser(description="Conversion et maintenance des bases Data_Base_Tennis")
+    commands = parser.add_subparsers(dest="command")
+
+    convert = commands.add_parser("convert", help="convertit un fichier .xlsx en .db")
+    convert.add_argument("excel_file", nargs="?", default='./Data_Base_Tennis/atp_2025.xlsx')
+    convert.add_argument("db_file", nargs="?", default='./Data_Base_Tennis/atp_2025.db')
+    convert.add_argument("--incremental", action="store_true", help="n'ajoute que les lignes nouvelles ou modifiées")
+
+    migrate = commands.add_parser("migrate", help="ajoute les index et tables dérivées aux bases existantes")
+    migrate.add_argument("db_files", nargs="*")
+
+    rebuild = commands.add_parser("rebuild", help="reconstruit en parallèle toutes les saisons à partir des .xlsx")
+    rebuild.add_argument("--data-dir", default='./Data_Base_Tennis')
+    rebuild.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : tous les cœurs)")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_databases(args.db_files or sorted(glob.glob('./Data_Base_Tennis/*.db')))
+    elif args.command == "rebuild":
+        rebuild_all(args.data_dir, args.workers)
+    else:
+        excel_file = getattr(args, "excel_file", './Data_Base_Tennis/atp_2025.xlsx')
+        db_file = getattr(args, "db_file", './Data_Base_Tennis/atp_2025.db')
+        excel_to_db(excel_file, db_file, incremental=getattr(args, "incremental", False))